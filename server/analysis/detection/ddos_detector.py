@@ -11,6 +11,8 @@ import sys
 import json
 import time
 import math
+from collections import deque
+from itertools import islice
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -38,6 +40,15 @@ MODEL_DIR.mkdir(exist_ok=True)
 DEFAULT_MODEL_PATH = MODEL_DIR / "ddqn_best_model.h5"
 SIMPLIFIED_MODEL_PATH = MODEL_DIR / "ddqn_best_model_simplified.json"
 
+# Najveći broj prozora prometa (poziva detect) koji se čuvaju u povijesti
+MAX_TRAFFIC_HISTORY = 1000
+
+# Najveći broj zapisa u povijesti napada (stariji zapisi se odbacuju)
+MAX_ATTACK_HISTORY = 1000
+
+# Broj najnovijih napada koji se vraćaju u rezultatu detekcije
+RECENT_ATTACKS = 5
+
 class DDoSDetector:
     """
     Detektor DDoS napada koji koristi DDQN model za analizu mrežnog prometa
@@ -55,13 +66,20 @@ class DDoSDetector:
         self.window_size = window_size
         self.model_path = model_path
         self.ddqn_agent = None
-        self.traffic_history = []
-        self.attack_history = []
+        self.traffic_history = deque(maxlen=MAX_TRAFFIC_HISTORY)
+        self.attack_history = deque(maxlen=MAX_ATTACK_HISTORY)
+        
+        # Zadnji napadi za rezultat detekcije; dijele rječnike s attack_history
+        # pa su ažuriranja postojećih zapisa odmah vidljiva
+        self._recent_attacks = deque(maxlen=RECENT_ATTACKS)
         self.last_attack_time = None
         self.last_attack_type = None
         self.attack_in_progress = False
         self.current_attack_severity = 0.0
         
+        # Monotoni početak napada u tijeku (za trajanje, bez parsiranja ISO zapisa)
+        self._current_attack_start = 0.0
+        
         # Inicijaliziraj dataset loader
         self.dataset_loader = DDQNDataLoader()
         
@@ -112,38 +130,38 @@ class DDoSDetector:
         
         # Izvlačenje potrebnih značajki
         try:
-            # Osnovne značajke
-            source_ips = [packet.get("src_ip", "unknown") for packet in traffic_data]
-            destination_ips = [packet.get("dst_ip", "unknown") for packet in traffic_data]
-            
-            unique_src_ips = set(source_ips)
-            unique_dst_ips = set(destination_ips)
-            
-            # Računanje značajki
+            # Osnovne značajke i brojači računaju se jednim prolazom kroz pakete
+            source_ips = []
+            destination_ips = []
+            add_src = source_ips.append
+            add_dst = destination_ips.append
             protocol_counts = {}
             syn_count = 0
             total_packet_size = 0
             
             for packet in traffic_data:
-                protocol = packet.get("protocol", "unknown")
+                # Metoda get se dohvaća jednom po paketu
+                get = packet.get
+                add_src(get("src_ip", "unknown"))
+                add_dst(get("dst_ip", "unknown"))
+                
+                protocol = get("protocol", "unknown")
                 protocol_counts[protocol] = protocol_counts.get(protocol, 0) + 1
                 
                 # SYN paketi
-                if packet.get("tcp_flags") == "S":
+                if get("tcp_flags") == "S":
                     syn_count += 1
                 
                 # Veličina paketa
-                packet_size = packet.get("packet_size", 0)
-                total_packet_size += packet_size
+                total_packet_size += get("packet_size", 0)
             
             # Normalizacija značajki
             total_packets = len(traffic_data)
             
-            # Shannon entropija izvorišnih IP adresa
-            source_entropy = self._calculate_entropy(source_ips)
-            
-            # Shannon entropija odredišnih IP adresa
-            destination_entropy = self._calculate_entropy(destination_ips)
+            # Shannon entropija izvorišnih i odredišnih IP adresa; broj jedinstvenih
+            # adresa čita se iz iste tablice frekvencija, bez zasebnog set()
+            source_entropy, unique_src = self._entropy_and_count(source_ips)
+            destination_entropy, unique_dst = self._entropy_and_count(destination_ips)
             
             # Omjer SYN paketa
             syn_ratio = syn_count / total_packets if total_packets > 0 else 0
@@ -156,8 +174,8 @@ class DDoSDetector:
             packet_rate = min(1.0, total_packets / (500 * time_span)) if time_span > 0 else 0
             
             # Broj jedinstvenih izvorišnih i odredišnih IP adresa
-            unique_src_count = min(1.0, len(unique_src_ips) / 100) if unique_src_ips else 0
-            unique_dst_count = min(1.0, len(unique_dst_ips) / 50) if unique_dst_ips else 0
+            unique_src_count = min(1.0, unique_src / 100) if unique_src else 0
+            unique_dst_count = min(1.0, unique_dst / 50) if unique_dst else 0
             
             # Mjera neravnoteže u distribuciji protokola
             protocol_imbalance = self._calculate_entropy(list(protocol_counts.keys()))
@@ -190,27 +208,42 @@ class DDoSDetector:
         Returns:
             Normalizirana Shannon entropija [0, 1]
         """
+        return self._entropy_and_count(values)[0]
+    
+    def _entropy_and_count(self, values):
+        """
+        Izračunava Shannon entropiju i broj različitih vrijednosti iz jedne
+        tablice frekvencija.
+        
+        Args:
+            values: Lista vrijednosti
+            
+        Returns:
+            tuple: (normalizirana Shannon entropija [0, 1], broj različitih vrijednosti)
+        """
         if not values:
-            return 0.0
+            return 0.0, 0
             
         # Računamo frekvencije
         freq_dict = {}
         for val in values:
             freq_dict[val] = freq_dict.get(val, 0) + 1
             
-        # Izračun entropije
+        # Izračun entropije (log2 vezan lokalno jer se poziva za svaku vrijednost)
+        log2 = math.log2
         entropy = 0.0
         n = len(values)
         for count in freq_dict.values():
             p = count / n
             if p > 0:
-                entropy -= p * math.log2(p)
+                entropy -= p * log2(p)
             
         # Normalizacija na raspon [0, 1]
-        max_entropy = math.log2(len(freq_dict)) if freq_dict else 0
+        unique = len(freq_dict)
+        max_entropy = log2(unique) if freq_dict else 0
         if max_entropy > 0:
-            return entropy / max_entropy
-        return 0.0
+            return entropy / max_entropy, unique
+        return 0.0, unique
     
     def detect(self, traffic_data):
         """
@@ -222,16 +255,12 @@ class DDoSDetector:
         Returns:
             dict: Rezultati detekcije
         """
-        # Dodaj trenutne podatke u povijest
+        # Dodaj trenutne podatke u povijest (prstenasti spremnik zadnjih MAX_TRAFFIC_HISTORY prozora)
         self.traffic_history.append(traffic_data)
         
-        # Ograniči povijest na zadnjih N paketa
-        max_history = 1000
-        if len(self.traffic_history) > max_history:
-            self.traffic_history = self.traffic_history[-max_history:]
-        
         # Predobradi podatke za posljednjih X paketa
-        current_window = self.traffic_history[-self.window_size:] if len(self.traffic_history) >= self.window_size else self.traffic_history
+        current_window = list(islice(reversed(self.traffic_history), self.window_size))
+        current_window.reverse()
         
         # Za svaki prozor računamo značajke
         features = []
@@ -270,18 +299,21 @@ class DDoSDetector:
                 if not self.attack_in_progress:
                     self.attack_in_progress = True
                     self.last_attack_time = now
+                    self._current_attack_start = time.monotonic()
                     
                     # Procijeni tip napada na temelju značajki
                     attack_type = self._estimate_attack_type(features[-1])
                     self.last_attack_type = attack_type
                     
                     # Zabilježi napad
-                    self.attack_history.append({
+                    attack = {
                         "start_time": now.isoformat(),
                         "type": attack_type,
                         "confidence": confidence,
                         "severity": self._estimate_attack_severity(features[-1])
-                    })
+                    }
+                    self.attack_history.append(attack)
+                    self._recent_attacks.append(attack)
                 else:
                     # Ako je napad već u tijeku, ažuriraj zadnji napad
                     if self.attack_history:
@@ -303,10 +335,8 @@ class DDoSDetector:
                         if self.attack_history:
                             self.attack_history[-1]["end_time"] = now.isoformat()
                             
-                            # Računanje trajanja napada
-                            start_time = datetime.fromisoformat(self.attack_history[-1]["start_time"])
-                            duration = (now - start_time).total_seconds()
-                            self.attack_history[-1]["duration"] = duration
+                            # Računanje trajanja napada iz monotonog sata, bez parsiranja ISO zapisa
+                            self.attack_history[-1]["duration"] = time.monotonic() - self._current_attack_start
             
             # Izgradnja rezultata
             result = {
@@ -322,7 +352,7 @@ class DDoSDetector:
                     "duration": (now - self.last_attack_time).total_seconds() if self.last_attack_time else 0,
                     "severity": self.current_attack_severity
                 } if self.attack_in_progress else None,
-                "recent_attacks": self.attack_history[-5:] if self.attack_history else []
+                "recent_attacks": list(self._recent_attacks)
             }
             
             return result
@@ -471,23 +501,29 @@ class DDoSDetector:
         Vraća povijest detektiranih napada.
         
         Args:
-            limit: Maksimalni broj napada za vraćanje
+            limit: Maksimalni broj napada za vraćanje (0 ili manje - svi)
             
         Returns:
             list: Povijest napada
         """
-        return self.attack_history[-limit:] if self.attack_history else []
+        # Čita se samo zadnjih limit zapisa, bez kopiranja cijele povijesti
+        count = len(self.attack_history) if limit <= 0 else limit
+        recent = list(islice(reversed(self.attack_history), count))
+        recent.reverse()
+        return recent
     
     def reset(self):
         """
         Resetira stanje detektora.
         """
-        self.traffic_history = []
-        self.attack_history = []
+        self.traffic_history = deque(maxlen=MAX_TRAFFIC_HISTORY)
+        self.attack_history = deque(maxlen=MAX_ATTACK_HISTORY)
+        self._recent_attacks.clear()
         self.last_attack_time = None
         self.last_attack_type = None
         self.attack_in_progress = False
         self.current_attack_severity = 0.0
+        self._current_attack_start = 0.0
         print("Stanje detektora resetirano.")
     
     def evaluate(self, test_data=None):
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+DDoS Defender - orjson-backed Flask JSON provider shared by the Python API
+and the analysis API. Import only when both Flask and orjson are available.
+"""
+
+import orjson
+from flask.json.provider import JSONProvider
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider that serializes through orjson. NumPy arrays and scalars
+    (e.g. model q_values and actions) serialize directly, without .tolist().
+    """
+
+    def __init__(self, app, option=orjson.OPT_SERIALIZE_NUMPY):
+        """
+        Args:
+            app: Flask application
+            option: orjson option flags used by dumps
+        """
+        super().__init__(app)
+        self.option = option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def _orjson_default(obj):
+    """
+    Convert types orjson does not handle natively (e.g. non-contiguous NumPy
+    arrays) to plain Python types.
+    """
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
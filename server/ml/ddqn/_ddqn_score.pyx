@@ -0,0 +1,50 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Cython jezgra za bodovanje stanja pojednostavljenog DDQN agenta.
+Koristi se kada Numba nije dostupan; kompilira se pri prvom korištenju
+putem pyximport (zastavice kompajlera su u _ddqn_score.pyxbld).
+"""
+
+import numpy as np
+from libc.math cimport fabs
+
+
+def score_batch(const double[:, ::1] states, const double[::1] thr,
+                const double[::1] w, const signed char[::1] mode):
+    """
+    Računa mjeru sumnje za svaki redak matrice stanja.
+
+    Args:
+        states: Matrica stanja (N x broj značajki), float64, C-contiguous
+        thr: Pragovi po značajki
+        w: Težine po značajki
+        mode: Način bodovanja po značajki (0 - veće je sumnjivije,
+            1 - manje je sumnjivije, 2 - odstupanje od praga)
+
+    Returns:
+        np.array: Mjera sumnje za svako stanje
+    """
+    cdef Py_ssize_t n = states.shape[0]
+    cdef Py_ssize_t f = min(states.shape[1], thr.shape[0])
+    cdef Py_ssize_t i, j
+    cdef double score, x, t
+
+    scores = np.zeros(n, dtype=np.float64)
+    cdef double[::1] out = scores
+
+    for i in range(n):
+        score = 0.0
+        for j in range(f):
+            x = states[i, j]
+            t = thr[j]
+            if mode[j] == 0:
+                if x > t:
+                    score += w[j] * (x - t) / (1 - t)
+            elif mode[j] == 1:
+                if x < t:
+                    score += w[j] * (t - x) / t
+            else:
+                score += w[j] * fabs(x - t)
+        out[i] = score
+
+    return scores
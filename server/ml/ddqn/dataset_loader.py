@@ -321,6 +321,45 @@ class DDQNDataLoader:
             # Vraća slučajnu epizodu
             return random.choice(episodes)
     
+    def get_partition(self, partition_id, num_partitions, dataset_type="train"):
+        """
+        Vraća loader ograničen na jednu particiju epizoda, prema tipu napada.
+        Tipovi napada raspoređuju se po particijama redom, a epizode bez napada
+        dodaju se u svaku particiju. Ostali skupovi podataka se ne dijele.
+
+        Args:
+            partition_id: Indeks particije (0 do num_partitions - 1)
+            num_partitions: Ukupan broj particija
+            dataset_type: Tip dataset-a koji se dijeli ('train', 'validation', 'test')
+
+        Returns:
+            DDQNDataLoader s podacima particije ili None ako dataset nije učitan
+        """
+        if not self.dataset:
+            if not self.load():
+                return None
+
+        episodes = self.dataset[dataset_type]
+
+        def attack_type(episode):
+            attack = episode.get("metadata", {}).get("attack")
+            return attack["type"] if attack else None
+
+        attack_types = sorted({attack_type(e) for e in episodes if attack_type(e) is not None})
+        partition_types = set(attack_types[partition_id::num_partitions])
+
+        partition = [e for e in episodes if attack_type(e) is None or attack_type(e) in partition_types]
+
+        # Particija bez ijednog napada nije korisna za trening pa se koristi cijeli skup
+        if not partition_types:
+            partition = episodes
+
+        loader = DDQNDataLoader(dataset_path=self.dataset_path)
+        loader.feature_names = self.feature_names
+        loader.dataset = dict(self.dataset)
+        loader.dataset[dataset_type] = partition
+        return loader
+
     def get_dataset_stats(self):
         """
         Vraća statistiku dataset-a.
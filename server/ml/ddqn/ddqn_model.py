@@ -8,12 +8,11 @@ Implementacija DDQN modela za detekciju DDoS napada prema definiranoj metodologi
 
 import os
 import sys
-import random
 import json
+import multiprocessing
 import math
 from datetime import datetime
 from pathlib import Path
-from collections import deque
 
 # Enabling imports from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -21,6 +20,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 # Provjera dostupnosti NumPy i TensorFlow
 try:
     import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
     NUMPY_AVAILABLE = True
 except ImportError:
     NUMPY_AVAILABLE = False
@@ -36,6 +36,23 @@ try:
 except ImportError:
     print("Warning: TensorFlow not available, using simplified model instead")
 
+# Numba je opcionalan i koristi se samo za ubrzanje heuristike
+# pojednostavljenog agenta
+NUMBA_AVAILABLE = False
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    pass
+
+# orjson je opcionalan i koristi se za brže spremanje/učitavanje parametara
+ORJSON_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    pass
+
 # Import iz našeg datasets paketa
 try:
     from ml.ddqn.dataset_loader import DDQNDataLoader
@@ -46,6 +63,95 @@ except ImportError as e:
 MODEL_DIR = Path(__file__).parent.parent / "models"
 MODEL_DIR.mkdir(exist_ok=True)
 
+# Cython jezgra za bodovanje (učitava se lijeno, samo ako je Cython dostupan)
+_SCORE_EXTENSION = None
+_SCORE_EXTENSION_LOADED = False
+
+def _get_score_extension():
+    """
+    Kompilira (pri prvom pozivu) i vraća Cython modul za bodovanje stanja.
+    
+    Returns:
+        Modul s funkcijom score_batch ili None ako Cython nije dostupan
+    """
+    global _SCORE_EXTENSION, _SCORE_EXTENSION_LOADED
+    
+    if not _SCORE_EXTENSION_LOADED:
+        _SCORE_EXTENSION_LOADED = True
+        try:
+            import pyximport
+            importers = pyximport.install(language_level=3)
+            try:
+                from ml.ddqn import _ddqn_score
+                _SCORE_EXTENSION = _ddqn_score
+            finally:
+                pyximport.uninstall(*importers)
+        except Exception as e:
+            print(f"Cython jezgra za bodovanje nije dostupna, koristi se NumPy: {e}")
+    
+    return _SCORE_EXTENSION
+
+def _json_default(obj):
+    """
+    Pretvara NumPy vrijednosti u Python tipove za stdlib json.
+    """
+    if NUMPY_AVAILABLE and isinstance(obj, np.generic):
+        return obj.item()
+    if NUMPY_AVAILABLE and isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _json_dumps(obj):
+    """
+    Serijalizira objekt u JSON (bytes) s uvlakom od 2 razmaka.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2, default=_json_default).encode("utf-8")
+
+def _json_loads(data):
+    """
+    Deserijalizira JSON iz bytes.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Način bodovanja značajki pojednostavljenog agenta:
+# 0 - veće vrijednosti su sumnjivije, 1 - manje vrijednosti su sumnjivije,
+# 2 - sumnjivo je odstupanje od praga
+HIGHER_IS_SUSPICIOUS = ["source_entropy", "syn_ratio", "traffic_volume",
+                        "packet_rate", "unique_src_count"]
+LOWER_IS_SUSPICIOUS = ["destination_entropy", "unique_dst_count"]
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True, fastmath=True)
+    def _score_kernel(state, thr, w, mode):
+        """
+        Kompilirani izračun mjere sumnje za jedno stanje.
+        """
+        score = 0.0
+        for i in range(min(state.shape[0], thr.shape[0])):
+            if mode[i] == 0:
+                if state[i] > thr[i]:
+                    score += w[i] * (state[i] - thr[i]) / (1 - thr[i])
+            elif mode[i] == 1:
+                if state[i] < thr[i]:
+                    score += w[i] * (thr[i] - state[i]) / thr[i]
+            else:
+                score += w[i] * abs(state[i] - thr[i])
+        return score
+
+    @numba.njit(cache=True, fastmath=True, parallel=True)
+    def _score_many_kernel(states, thr, w, mode):
+        """
+        Kompilirani izračun mjere sumnje za matricu stanja (paralelno po retcima).
+        """
+        scores = np.zeros(states.shape[0])
+        for j in numba.prange(states.shape[0]):
+            scores[j] = _score_kernel(states[j], thr, w, mode)
+        return scores
+
 class SimplifiedDDQNAgent:
     """
     Pojednostavljeni DDQN agent za slučajeve kada TensorFlow nije dostupan.
@@ -86,6 +192,28 @@ class SimplifiedDDQNAgent:
             0.02,  # unique_dst_ips_count
             0.03   # protocol_imbalance
         ]
+        
+        self._build_score_tables()
+    
+    def _build_score_tables(self):
+        """
+        Priprema tablicu (prag, težina, način bodovanja) po značajki kako
+        bi se izbjegli dohvati iz rječnika pri svakom pozivu act-a, te
+        iste vrijednosti kao NumPy polja za kompilirani izračun.
+        """
+        names = list(self.thresholds.keys())
+        modes = [
+            0 if name in HIGHER_IS_SUSPICIOUS else 1 if name in LOWER_IS_SUSPICIOUS else 2
+            for name in names
+        ]
+        self._feat_table = list(zip(self.thresholds.values(), self.feature_weights, modes))
+        
+        if not NUMPY_AVAILABLE:
+            return
+        
+        self._thr = np.array(list(self.thresholds.values()), dtype=np.float64)
+        self._w = np.array(self.feature_weights[:len(names)], dtype=np.float64)
+        self._mode = np.array(modes, dtype=np.int8)
     
     def act(self, state):
         """
@@ -97,24 +225,25 @@ class SimplifiedDDQNAgent:
         Returns:
             int: 0 za normalno stanje, 1 za detektirani napad
         """
+        # Kompilirana inačica bodovanja ako je Numba dostupan
+        if NUMBA_AVAILABLE and (isinstance(state, list) or isinstance(state, np.ndarray)):
+            state = np.asarray(state, dtype=np.float64)[:self.state_size]
+            suspicion_score = _score_kernel(state, self._thr, self._w, self._mode)
+            return 1 if suspicion_score > 0.45 else 0
+        
         # Jednostavni bodovni sustav na temelju heuristika
         suspicion_score = 0.0
         
         # Provjeri je li stanje NumPy array ili lista
         if isinstance(state, list) or (NUMPY_AVAILABLE and isinstance(state, np.ndarray)):
             # Izračunaj mjeru sumnje na temelju pragova i težina
-            for i, feature in enumerate(state[:self.state_size]):
-                feature_name = list(self.thresholds.keys())[i]
-                threshold = self.thresholds[feature_name]
-                weight = self.feature_weights[i]
-                
+            for feature, (threshold, weight, mode) in zip(state[:self.state_size], self._feat_table):
                 # Različite logike ovisno o značajki
-                if feature_name in ["source_entropy", "syn_ratio", "traffic_volume", 
-                                   "packet_rate", "unique_src_count"]:
+                if mode == 0:
                     # Za ove značajke, veće vrijednosti su sumnjivije
                     if feature > threshold:
                         suspicion_score += weight * (feature - threshold) / (1 - threshold)
-                elif feature_name in ["destination_entropy", "unique_dst_count"]:
+                elif mode == 1:
                     # Za ove značajke, manje vrijednosti su sumnjivije
                     if feature < threshold:
                         suspicion_score += weight * (threshold - feature) / threshold
@@ -125,6 +254,58 @@ class SimplifiedDDQNAgent:
         # Ako je suspicion_score veći od 0.5, to je napad
         return 1 if suspicion_score > 0.45 else 0
     
+    def act_batch(self, states):
+        """
+        Odabire akcije za više stanja odjednom.
+        
+        Args:
+            states: Lista ili matrica stanja (N x broj značajki)
+            
+        Returns:
+            list: Akcije (0 ili 1) za svako stanje
+        """
+        if NUMBA_AVAILABLE and len(states) > 0:
+            states = np.asarray(states, dtype=np.float64)[:, :self.state_size]
+            scores = _score_many_kernel(np.ascontiguousarray(states), self._thr, self._w, self._mode)
+            return (scores > 0.45).astype(int).tolist()
+        
+        if NUMPY_AVAILABLE and len(states) > 0:
+            extension = _get_score_extension()
+            if extension is not None:
+                states = np.ascontiguousarray(np.asarray(states, dtype=np.float64)[:, :self.state_size])
+                scores = np.asarray(extension.score_batch(states, self._thr, self._w, self._mode))
+            else:
+                scores = self._score_batch(states)
+            return (scores > 0.45).astype(int).tolist()
+        
+        return [self.act(state) for state in states]
+    
+    def _score_batch(self, states):
+        """
+        Vektorizirani izračun mjere sumnje bez grananja: doprinosi za sva tri
+        načina bodovanja računaju se za cijelu matricu, a maska načina odabire
+        odgovarajući doprinos po značajki.
+        
+        Args:
+            states: Matrica stanja (N x broj značajki)
+            
+        Returns:
+            np.array: Mjera sumnje za svako stanje
+        """
+        states = np.asarray(states, dtype=np.float64)
+        n = min(states.shape[1], self.state_size, len(self._thr))
+        states = states[:, :n]
+        thr, w, mode = self._thr[:n], self._w[:n], self._mode[:n]
+        
+        above = np.maximum(states - thr, 0.0)
+        below = np.maximum(thr - states, 0.0)
+        up = np.divide(above, 1 - thr, out=np.zeros_like(above), where=above > 0)
+        down = np.divide(below, thr, out=np.zeros_like(below), where=below > 0)
+        dev = np.abs(states - thr)
+        
+        contributions = np.where(mode == 0, up, np.where(mode == 1, down, dev))
+        return contributions @ w
+    
     def save(self, filepath):
         """
         Sprema parametre agenta.
@@ -140,8 +321,8 @@ class SimplifiedDDQNAgent:
             "saved_at": datetime.now().isoformat()
         }
         
-        with open(filepath, 'w') as f:
-            json.dump(params, f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(_json_dumps(params))
         
         print(f"Parametri spremljeni u: {filepath}")
     
@@ -153,13 +334,14 @@ class SimplifiedDDQNAgent:
             filepath: Putanja za učitavanje
         """
         try:
-            with open(filepath, 'r') as f:
-                params = json.load(f)
+            with open(filepath, 'rb') as f:
+                params = _json_loads(f.read())
             
             self.thresholds = params["thresholds"]
             self.feature_weights = params["feature_weights"]
             self.state_size = params["state_size"]
             self.action_size = params["action_size"]
+            self._build_score_tables()
             
             print(f"Parametri učitani iz: {filepath}")
             return True
@@ -178,7 +360,7 @@ class SimplifiedDDQNAgent:
         Returns:
             dict: Metrike evaluacije
         """
-        predictions = [self.act(state) for state in states]
+        predictions = self.act_batch(states)
         
         # Izračun metrika
         tp = sum(1 for p, l in zip(predictions, labels) if p == 1 and l == 1)
@@ -203,6 +385,162 @@ class SimplifiedDDQNAgent:
         }
 
 
+class ReplayMemory:
+    """
+    Replay memorija DDQN agenta u obliku prstenastog spremnika.
+    Svaka komponenta iskustva čuva se u vlastitom unaprijed alociranom
+    NumPy polju, pa se batch dohvaća jednim indeksiranjem bez slaganja.
+    """
+    
+    def __init__(self, capacity, state_dim):
+        """
+        Inicijalizacija replay memorije.
+        
+        Args:
+            capacity: Maksimalni broj iskustava (najstarija se prepisuju)
+            state_dim: Dimenzija (ravnog) vektora stanja
+        """
+        self.capacity = capacity
+        self.state_dim = state_dim
+        
+        self.states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        
+        self._pos = 0
+        self._size = 0
+        self._rng = np.random.default_rng()
+    
+    def __len__(self):
+        return self._size
+    
+    def append(self, state, action, reward, next_state, done):
+        """
+        Sprema iskustvo na sljedeće mjesto u spremniku.
+        
+        Args:
+            state: Trenutno stanje
+            action: Poduzeta akcija
+            reward: Primljena nagrada
+            next_state: Sljedeće stanje
+            done: Zastavica je li epizoda završena
+        """
+        i = self._pos
+        self.states[i] = np.reshape(state, -1)
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = np.reshape(next_state, -1)
+        self.dones[i] = done
+        
+        self._pos = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+    
+    def sample(self, batch_size, recent=0):
+        """
+        Dohvaća slučajni batch iskustava.
+        
+        Args:
+            batch_size: Veličina batch-a
+            recent: Broj najnovijih iskustava koja su sigurno u batch-u
+                (ostatak se bira slučajno)
+            
+        Returns:
+            tuple: (states, actions, rewards, next_states, dones)
+        """
+        recent = min(recent, batch_size, self._size)
+        idx = self._rng.integers(0, self._size, batch_size)
+        if recent:
+            # Najnovija iskustva leže neposredno prije pozicije pisanja (kružno)
+            idx[:recent] = (self._pos - 1 - np.arange(recent)) % self.capacity
+        return (self.states[idx], self.actions[idx], self.rewards[idx],
+                self.next_states[idx], self.dones[idx])
+
+
+class ParallelEpisodeRunner:
+    """
+    Istovremeno izvodi više trening epizoda iz dataset-a kako bi agent
+    u svakom koraku obradio stanja svih epizoda jednim pozivom mreže.
+    """
+    
+    def __init__(self, dataset_loader, num_envs, window_size, max_steps=None, dataset_type="train"):
+        """
+        Inicijalizacija runnera i dohvat epizoda.
+        
+        Args:
+            dataset_loader: Loader za dataset
+            num_envs: Broj epizoda koje se izvode istovremeno
+            window_size: Veličina vremenskog prozora za ulaz
+            max_steps: Maksimalni broj koraka po epizodi
+            dataset_type: Tip dataset-a ('train', 'validation', 'test')
+        """
+        self.windows = []
+        self.labels = []
+        steps = []
+        
+        for _ in range(num_envs):
+            episode = dataset_loader.get_episode(dataset_type=dataset_type)
+            features = episode["features"]
+            
+            # Određivanje broja koraka u epizodi
+            steps.append(min(len(features), max_steps) if max_steps else len(features))
+            
+            # Svi prozori stanja epizode grade se odjednom; početak se dopunjava
+            # prvim stanjem kako bi i početni koraci imali puni prozor
+            feat_arr = np.asarray(features, dtype=np.float32)
+            padded = np.pad(feat_arr, ((window_size - 1, 0), (0, 0)), mode='edge')
+            windows = sliding_window_view(padded, (window_size, feat_arr.shape[1]))
+            self.windows.append(windows.reshape(-1, window_size * feat_arr.shape[1]))
+            self.labels.append(np.asarray(episode["attack_labels"], dtype=np.int64))
+        
+        self.steps = np.array(steps)
+        self.positions = np.zeros(num_envs, dtype=np.int64)
+    
+    def active(self):
+        """
+        Returns:
+            np.array: Indeksi epizoda koje još nisu završile
+        """
+        return np.flatnonzero(self.positions < self.steps)
+    
+    def observe(self, envs):
+        """
+        Vraća trenutna stanja i oznake za zadane epizode.
+        
+        Args:
+            envs: Indeksi aktivnih epizoda
+            
+        Returns:
+            tuple: (stanja oblika (len(envs), input_dim), oznake)
+        """
+        states = np.stack([self.windows[i][self.positions[i]] for i in envs])
+        labels = np.array([self.labels[i][self.positions[i]] for i in envs])
+        return states, labels
+    
+    def advance(self, envs):
+        """
+        Pomiče zadane epizode za jedan korak.
+        
+        Args:
+            envs: Indeksi aktivnih epizoda
+            
+        Returns:
+            tuple: (sljedeća stanja, zastavice završetka)
+        """
+        next_positions = self.positions[envs] + 1
+        dones = next_positions >= self.steps[envs]
+        
+        # Ako smo na kraju epizode, koristimo trenutno stanje
+        next_states = np.stack([
+            self.windows[i][pos - 1 if done else pos]
+            for i, pos, done in zip(envs, next_positions, dones)
+        ])
+        
+        self.positions[envs] = next_positions
+        return next_states, dones
+
+
 class DDQNAgent:
     """
     DDQN (Double Deep Q-Network) Agent za detekciju DDoS napada.
@@ -229,19 +567,24 @@ class DDQNAgent:
         self.input_dim = state_size * window_size
         
         # Hiperparametri modela
-        self.memory = deque(maxlen=2000)
+        self.memory = ReplayMemory(2000, self.input_dim)
         self.gamma = 0.95    # Discount factor
         self.epsilon = 1.0   # Exploration rate
         self.epsilon_min = 0.01
         self.epsilon_decay = 0.995
         self.learning_rate = 0.001
         self.update_target_frequency = 5  # Frekvencija ažuriranja target mreže
+        self._rng = np.random.default_rng()  # Generator za epsilon-greedy odabir
         
         # Izgradnja modela
         self.model = self._build_model()
         self.target_model = self._build_model()
+        self._build_graphs()
         self.update_target_model()
         
+        # Kvantizirani (int8) TFLite model za inferenciju, ako je učitan
+        self._tflite = None
+        
         # Brojač koraka za target update
         self.target_update_counter = 0
     
@@ -269,14 +612,84 @@ class DDQNAgent:
         model.compile(loss='mse', optimizer=Adam(learning_rate=self.learning_rate))
         return model
     
-    def update_target_model(self):
+    def _build_graphs(self):
+        """
+        Priprema tf.function grafove s fiksnim ulaznim oblikom za odabir
+        akcije, inferenciju i trening, kako se ne bi ponovno trasirali
+        pri svakom pozivu. Grafovi se kompiliraju XLA-om (jit_compile), koji
+        slojeve male mreže spaja u kernele specijalizirane za oblik ulaza.
+        Mora se ponoviti nakon zamjene modela (load to čini samo kad se
+        arhitektura promijeni).
+        """
+        model = self.model
+        target_model = self.target_model
+        batch_signature = [tf.TensorSpec(shape=[None, self.input_dim], dtype=tf.float32)]
+        
+        self._act_graph = tf.function(
+            lambda x: tf.argmax(model(x, training=False)[0], output_type=tf.int32),
+            input_signature=[tf.TensorSpec(shape=[1, self.input_dim], dtype=tf.float32)],
+            jit_compile=True
+        )
+        self._infer_fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=batch_signature,
+            jit_compile=True
+        )
+        self._target_predict_graph = tf.function(
+            lambda x: target_model(x, training=False),
+            input_signature=batch_signature,
+            jit_compile=True
+        )
+        
+        optimizer = model.optimizer
+        optimizer.build(model.trainable_variables)
+        
+        @tf.function(jit_compile=True)
+        def replay_step(states, next_states, actions, rewards, dones, gamma):
+            # DDQN target: Q-vrijednosti glavne mreže, s vrijednošću poduzete
+            # akcije zamijenjenom nagradom i procjenom target mreže
+            t_next = target_model(next_states, training=False)
+            future = tf.where(dones, 0.0, gamma * tf.reduce_max(t_next, axis=1))
+            indices = tf.stack([tf.range(tf.shape(actions)[0]), actions], axis=1)
+            targets = tf.tensor_scatter_nd_update(
+                model(states, training=False), indices, rewards + future
+            )
+            
+            with tf.GradientTape() as tape:
+                q_values = model(states, training=True)
+                loss = tf.reduce_mean(tf.square(targets - q_values))
+            
+            gradients = tape.gradient(loss, model.trainable_variables)
+            optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+            return loss
+        
+        self._replay_step = replay_step
+        
+        @tf.function
+        def copy_weights(tau):
+            # Sve varijable (uključujući BatchNorm statistike), kao set_weights
+            for target_var, var in zip(target_model.weights, model.weights):
+                target_var.assign(tau * var + (1.0 - tau) * target_var)
+        
+        self._copy_weights = copy_weights
+        
+        # Batch stanja drže se u trajnim varijablama (alociraju se pri
+        # prvom replay-u za danu veličinu batch-a)
+        self._batch_state_var = None
+        self._batch_next_state_var = None
+    
+    def update_target_model(self, tau=1.0):
         """
         Ažurira težine target mreže da odgovaraju glavnoj mreži.
+        
+        Args:
+            tau: Udio težina glavne mreže (1.0 za potpunu kopiju, manje
+                vrijednosti za meko (polyak) ažuriranje)
         """
         if not TF_AVAILABLE:
             return
             
-        self.target_model.set_weights(self.model.get_weights())
+        self._copy_weights(tf.constant(tau, dtype=tf.float32))
     
     def memorize(self, state, action, reward, next_state, done):
         """
@@ -292,7 +705,7 @@ class DDQNAgent:
         if not TF_AVAILABLE:
             return
             
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.append(state, action, reward, next_state, done)
     
     def act(self, state):
         """
@@ -307,57 +720,71 @@ class DDQNAgent:
         if not TF_AVAILABLE:
             return self.simplified_agent.act(state)
             
-        # Reshape stanja ako je potrebno
-        if NUMPY_AVAILABLE and isinstance(state, np.ndarray):
-            if len(state.shape) < 2:
-                state = np.reshape(state, [1, self.input_dim])
-        
         # Epsilon-greedy pristup
-        if np.random.rand() <= self.epsilon:
-            return random.randrange(self.action_size)
+        if self._rng.random() <= self.epsilon:
+            return int(self._rng.integers(self.action_size))
         
-        act_values = self.model.predict(state)
-        return np.argmax(act_values[0])
+        # Graf očekuje stanje oblika (1, input_dim)
+        state = np.reshape(np.asarray(state, dtype=np.float32), [1, self.input_dim])
+        return int(self._act_graph(tf.constant(state)))
     
-    def replay(self, batch_size):
+    def replay(self, batch_size, recent=0, steps=1):
         """
         Trenira model na batch-u iskustava iz replay memorije.
         
         Args:
             batch_size: Veličina batch-a
+            recent: Broj najnovijih iskustava koja moraju biti u batch-u
+            steps: Broj koraka okoline koje ovaj poziv pokriva; epsilon i brojač
+                za target mrežu napreduju kao da je replay pozvan po koraku
+            
+        Returns:
+            float: Loss treninga na batch-u, ili None ako trening nije proveden
         """
         if not TF_AVAILABLE or len(self.memory) < batch_size:
-            return
+            return None
             
-        minibatch = random.sample(self.memory, batch_size)
+        # Batch stanja (batch_size, input_dim) obrađuje se jednim pozivom
+        # mreže umjesto po uzorku
+        states, actions, rewards, next_states, dones = self.memory.sample(batch_size, recent=recent)
         
-        for state, action, reward, next_state, done in minibatch:
-            target = self.model.predict(state)
-            
-            if done:
-                target[0][action] = reward
-            else:
-                t = self.target_model.predict(next_state)
-                target[0][action] = reward + self.gamma * np.amax(t[0])
-            
-            self.model.fit(state, target, epochs=1, verbose=0)
+        if self._batch_state_var is None or self._batch_state_var.shape[0] != batch_size:
+            self._batch_state_var = tf.Variable(tf.zeros([batch_size, self.input_dim], dtype=tf.float32))
+            self._batch_next_state_var = tf.Variable(tf.zeros([batch_size, self.input_dim], dtype=tf.float32))
+        self._batch_state_var.assign(states)
+        self._batch_next_state_var.assign(next_states)
+        
+        # Izgradnja targeta i korak optimizacije izvode se u jednom grafu
+        loss = float(self._replay_step(
+            self._batch_state_var, self._batch_next_state_var,
+            tf.constant(actions), tf.constant(rewards), tf.constant(dones),
+            tf.constant(self.gamma, dtype=tf.float32)
+        ))
         
+        # Kvantizirani model više ne odgovara ažuriranim težinama
+        self._tflite = None
+
         # Smanjenje epsilon za exploration
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
+        for _ in range(steps):
+            if self.epsilon > self.epsilon_min:
+                self.epsilon *= self.epsilon_decay
         
         # Ažuriranje target mreže
-        self.target_update_counter += 1
+        self.target_update_counter += steps
         if self.target_update_counter >= self.update_target_frequency:
             self.update_target_model()
-            self.target_update_counter = 0
+            self.target_update_counter %= self.update_target_frequency
+        
+        return loss
     
-    def save(self, filepath):
+    def save(self, filepath, export_tflite=True):
         """
         Sprema DDQN model.
         
         Args:
             filepath: Putanja za spremanje
+            export_tflite: Zastavica za dodatni izvoz kvantiziranog (int8)
+                TFLite modela za inferenciju
         """
         if not TF_AVAILABLE:
             # Ako TensorFlow nije dostupan, spremi parametre pojednostavljenog agenta
@@ -368,6 +795,13 @@ class DDQNAgent:
         try:
             self.model.save(filepath)
             
+            tflite_path = filepath.replace(".h5", ".tflite")
+            if export_tflite:
+                self.export_quantized(tflite_path)
+            elif os.path.exists(tflite_path):
+                # Stari kvantizirani model ne odgovara novim težinama, a load bi ga inače koristio
+                os.remove(tflite_path)
+            
             # Spremamo i konfiguraciju agenta
             config_path = filepath.replace(".h5", "_config.json")
             config = {
@@ -382,8 +816,8 @@ class DDQNAgent:
                 "saved_at": datetime.now().isoformat()
             }
             
-            with open(config_path, 'w') as f:
-                json.dump(config, f, indent=2)
+            with open(config_path, 'wb') as f:
+                f.write(_json_dumps(config))
             
             print(f"Model spremljen u: {filepath}")
             print(f"Konfiguracija spremljena u: {config_path}")
@@ -403,23 +837,41 @@ class DDQNAgent:
             return self.simplified_agent.load(simplified_filepath)
             
         try:
-            self.model = load_model(filepath)
-            self.target_model = load_model(filepath)
+            loaded_model = load_model(filepath)
             
             # Učitavamo konfiguraciju agenta
             config_path = filepath.replace(".h5", "_config.json")
-            with open(config_path, 'r') as f:
-                config = json.load(f)
+            with open(config_path, 'rb') as f:
+                config = _json_loads(f.read())
             
-            self.state_size = config["state_size"]
-            self.action_size = config["action_size"]
-            self.window_size = config["window_size"]
-            self.input_dim = self.state_size * self.window_size
+            loaded_weights = loaded_model.get_weights()
+            if [w.shape for w in loaded_weights] == [tuple(v.shape) for v in self.model.weights]:
+                # Ista arhitektura: samo se prepišu težine, a grafovi i optimizator
+                # izgrađeni u konstruktoru ostaju (bez ponovnog trasiranja)
+                self.model.set_weights(loaded_weights)
+            else:
+                self.state_size = config["state_size"]
+                self.action_size = config["action_size"]
+                self.window_size = config["window_size"]
+                self.input_dim = self.state_size * self.window_size
+                if self.memory.state_dim != self.input_dim:
+                    self.memory = ReplayMemory(self.memory.capacity, self.input_dim)
+                self.model = loaded_model
+                self.target_model = tf.keras.models.clone_model(self.model)
+                self._build_graphs()
+            self.update_target_model()
             self.gamma = config["gamma"]
             self.epsilon = config["epsilon"]
             self.epsilon_min = config["epsilon_min"]
             self.epsilon_decay = config["epsilon_decay"]
             self.learning_rate = config["learning_rate"]
+            self.model.optimizer.learning_rate.assign(self.learning_rate)
+            
+            # Ako uz model postoji kvantizirana inačica, koristi se za inferenciju
+            tflite_path = filepath.replace(".h5", ".tflite")
+            self._tflite = None
+            if os.path.exists(tflite_path):
+                self.load_quantized(tflite_path)
             
             print(f"Model učitan iz: {filepath}")
             return True
@@ -427,6 +879,112 @@ class DDQNAgent:
             print(f"Greška pri učitavanju modela: {e}")
             return False
     
+    def export_quantized(self, filepath, representative_states=None):
+        """
+        Izvozi model u TFLite format s int8 kvantizacijom nakon treninga.
+        
+        Args:
+            filepath: Putanja za spremanje .tflite datoteke
+            representative_states: Stanja za kalibraciju raspona aktivacija.
+                Ako nisu navedena, koriste se stanja iz replay memorije ili
+                slučajna stanja u rasponu [0, 1].
+        """
+        if representative_states is None:
+            if len(self.memory) > 0:
+                representative_states = self.memory.states[:len(self.memory)]
+            else:
+                representative_states = self._rng.random((100, self.input_dim))
+        representative_states = np.asarray(representative_states, dtype=np.float32)
+        
+        def representative_dataset():
+            for state in representative_states[:200]:
+                yield [np.reshape(state, [1, self.input_dim])]
+        
+        try:
+            converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+            
+            with open(filepath, 'wb') as f:
+                f.write(converter.convert())
+            
+            print(f"Kvantizirani model spremljen u: {filepath}")
+        except Exception as e:
+            print(f"Greška pri izvozu kvantiziranog modela: {e}")
+    
+    def load_quantized(self, filepath):
+        """
+        Učitava kvantizirani TFLite model koji predict zatim koristi
+        umjesto Keras modela (dok se model ponovno ne trenira).
+        
+        Args:
+            filepath: Putanja do .tflite datoteke
+        """
+        try:
+            interpreter = tf.lite.Interpreter(model_path=str(filepath))
+            interpreter.allocate_tensors()
+            self._tflite = {
+                "interpreter": interpreter,
+                "input": interpreter.get_input_details()[0],
+                "output": interpreter.get_output_details()[0],
+                "batch_size": 1
+            }
+            print(f"Kvantizirani model učitan iz: {filepath}")
+            return True
+        except Exception as e:
+            print(f"Greška pri učitavanju kvantiziranog modela: {e}")
+            self._tflite = None
+            return False
+    
+    def predict_quantized(self, state):
+        """
+        Računa Q-vrijednosti kvantiziranim (int8) modelom.
+        
+        Args:
+            state: Stanje za predikciju
+            
+        Returns:
+            np.array: Q-vrijednosti (dekvantizirane)
+        """
+        return self.predict_quantized_batch(state)[0]
+    
+    def predict_quantized_batch(self, states):
+        """
+        Računa Q-vrijednosti kvantiziranim (int8) modelom za više stanja
+        jednim pozivom interpretera.
+        
+        Args:
+            states: Matrica stanja (N x input_dim)
+            
+        Returns:
+            np.array: Q-vrijednosti (dekvantizirane), oblika (N, broj akcija)
+        """
+        interpreter = self._tflite["interpreter"]
+        input_details = self._tflite["input"]
+        output_details = self._tflite["output"]
+        
+        # Kvantizacija ulaza prema parametrima modela
+        scale, zero_point = input_details["quantization"]
+        states = np.reshape(np.asarray(states, dtype=np.float32), [-1, self.input_dim])
+        quantized = np.clip(np.round(states / scale + zero_point), -128, 127).astype(np.int8)
+        
+        # Ulazni tensor se preoblikuje samo kad se promijeni veličina batch-a
+        if self._tflite["batch_size"] != len(states):
+            interpreter.resize_tensor_input(input_details["index"], [len(states), self.input_dim])
+            interpreter.allocate_tensors()
+            self._tflite["batch_size"] = len(states)
+        
+        interpreter.set_tensor(input_details["index"], quantized)
+        interpreter.invoke()
+        output = interpreter.get_tensor(output_details["index"])
+        
+        # Dekvantizacija izlaza
+        scale, zero_point = output_details["quantization"]
+        return (output.astype(np.float32) - zero_point) * scale
+    
     def evaluate(self, states, labels):
         """
         Evaluira model na skupu podataka.
@@ -447,7 +1005,7 @@ class DDQNAgent:
                 states = np.reshape(states, [-1, self.input_dim])
         
         # Predikcije modela
-        q_values = self.model.predict(states)
+        q_values = self._predict_batched(states)
         predictions = np.argmax(q_values, axis=1)
         
         # Izračun metrika
@@ -478,8 +1036,28 @@ class DDQNAgent:
             "false_negatives": int(fn)
         }
     
+    def _predict_batched(self, states, batch_size=1024):
+        """
+        Računa Q-vrijednosti za veći skup stanja kroz tf.data pipeline,
+        batch po batch, uz prefetch sljedećeg batch-a.
+        
+        Args:
+            states: Matrica stanja oblika (N, input_dim)
+            batch_size: Veličina batch-a za predikciju
+            
+        Returns:
+            np.array: Q-vrijednosti oblika (N, action_size)
+        """
+        states = np.asarray(states, dtype=np.float32)
+        if len(states) == 0:
+            return np.zeros((0, self.action_size), dtype=np.float32)
+        
+        dataset = tf.data.Dataset.from_tensor_slices(states).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+        return np.concatenate([self._infer_fn(batch).numpy() for batch in dataset])
+    
     def train(self, dataset_loader, num_episodes=100, batch_size=32, 
-              max_steps=None, early_stopping=True, validation_interval=5):
+              max_steps=None, early_stopping=True, validation_interval=5,
+              num_envs=1, checkpoint_path=None):
         """
         Trenira model na dataset-u.
         
@@ -490,6 +1068,10 @@ class DDQNAgent:
             max_steps: Maksimalni broj koraka po epizodi
             early_stopping: Zastavica za rano zaustavljanje
             validation_interval: Interval epizoda za validaciju
+            num_envs: Broj epizoda koje se istovremeno izvode u svakoj
+                iteraciji treninga (akcije za sve se biraju jednim pozivom mreže)
+            checkpoint_path: Putanja za spremanje najboljeg modela
+                (zadano MODEL_DIR/ddqn_best_model.h5)
             
         Returns:
             dict: Povijest treninga
@@ -505,6 +1087,11 @@ class DDQNAgent:
                 print("Učitavanje dataset-a nije uspjelo.")
                 return None
         
+        # Trening mijenja težine, pa kvantizirani model više ne vrijedi
+        self._tflite = None
+        
+        best_model_path = Path(checkpoint_path) if checkpoint_path else MODEL_DIR / "ddqn_best_model.h5"
+        
         history = {
             "loss": [],
             "accuracy": [],
@@ -517,71 +1104,62 @@ class DDQNAgent:
         for episode in range(num_episodes):
             print(f"Epizoda {episode+1}/{num_episodes}")
             
-            # Dohvati slučajnu epizodu iz dataset-a
-            train_episode = dataset_loader.get_episode(dataset_type="train")
-            features = train_episode["features"]
-            attack_labels = train_episode["attack_labels"]
-            
-            # Određivanje broja koraka u epizodi
-            steps = min(len(features), max_steps) if max_steps else len(features)
+            # Dohvati slučajne epizode iz dataset-a
+            runner = ParallelEpisodeRunner(dataset_loader, num_envs, self.window_size, max_steps)
             
             episode_loss = []
             episode_acc = []
             
-            for step in range(steps):
-                # Trenutno stanje
-                if step < self.window_size:
-                    # Za početne korake gdje nemamo dovoljno povijesti
-                    state = features[:step+1]
-                    # Dopuni do pune veličine prozora
-                    while len(state) < self.window_size:
-                        state.insert(0, state[0])
-                else:
-                    # Normalni slučaj
-                    state = features[step-self.window_size+1:step+1]
+            envs = runner.active()
+            while len(envs) > 0:
+                # Trenutna stanja i oznake svih aktivnih epizoda
+                states, labels = runner.observe(envs)
+                n = len(envs)
                 
-                state = np.reshape(state, [1, -1])
+                # Q-vrijednosti trenutnih stanja računaju se jednom po koraku i
+                # koriste za odabir akcije i izgradnju targeta
+                q_cur = self._infer_fn(tf.constant(states)).numpy()
+                pred_actions = np.argmax(q_cur, axis=1)
                 
-                # Oznaka za trenutno stanje
-                label = attack_labels[step]
+                # Odabir akcija (epsilon-greedy)
+                explore = self._rng.random(n) <= self.epsilon
+                actions = np.where(explore, self._rng.integers(self.action_size, size=n), pred_actions)
                 
-                # Odabir akcije
-                action = self.act(state)
+                # Izračun nagrada
+                rewards = np.where(actions == labels, 1, -1)
                 
-                # Izračun nagrade
-                reward = 1 if action == label else -1
+                # Sljedeća stanja i zastavice jesu li epizode završene
+                next_states, dones = runner.advance(envs)
                 
-                # Sljedeće stanje
-                if step + 1 < steps:
-                    next_features = features[step+1-self.window_size+1:step+2] if step + 1 >= self.window_size else features[:step+2]
-                    while len(next_features) < self.window_size:
-                        next_features.insert(0, next_features[0])
-                    next_state = np.reshape(next_features, [1, -1])
-                else:
-                    # Ako smo na kraju epizode, koristimo trenutno stanje
-                    next_state = state
-                
-                # Zastavica je li epizoda završena
-                done = step + 1 >= steps
-                
-                # Spremanje iskustva
-                self.memorize(state, action, reward, next_state, done)
+                # Spremanje iskustava
+                for i in range(n):
+                    self.memorize(states[i:i+1], int(actions[i]), int(rewards[i]),
+                                  next_states[i:i+1], bool(dones[i]))
                 
-                # Trening na batch-u
-                if len(self.memory) >= batch_size:
-                    self.replay(batch_size)
+                # Trening na batch-u; upravo spremljena iskustva uvijek se
+                # ubacuju u batch, pa dodatni korak na trenutnim stanjima nije
+                # potreban. Jedan replay pokriva n koraka (epsilon se smanjuje
+                # po koraku), a točnost se kao i prije mjeri modelom nakon replay-a.
+                replayed = len(self.memory) >= batch_size
+                if replayed:
+                    loss = self.replay(batch_size, recent=n, steps=n)
+                    pred_actions = np.argmax(self._infer_fn(tf.constant(states)).numpy(), axis=1)
                 
-                # Bilježenje rezultata
-                target = self.model.predict(state)
-                target[0][action] = reward if done else reward + self.gamma * np.amax(self.target_model.predict(next_state)[0])
-                loss = self.model.train_on_batch(state, target)
+                # Bez replay-a, ili ako je iskustava više nego što batch prima, trenira se izravno
+                if not replayed or n > batch_size:
+                    targets = q_cur.copy()
+                    future = np.zeros(n, dtype=np.float32)
+                    if not dones.all():
+                        t_next = self._target_predict_graph(tf.constant(next_states)).numpy()
+                        future = np.where(dones, 0.0, self.gamma * np.amax(t_next, axis=1))
+                    targets[np.arange(n), actions] = rewards + future
+                    loss = self.model.train_on_batch(states, targets)
                 episode_loss.append(loss)
                 
                 # Računanje točnosti
-                q_values = self.model.predict(state)
-                pred_action = np.argmax(q_values[0])
-                acc = 1 if pred_action == label else 0
-                episode_acc.append(acc)
+                episode_acc.extend((pred_actions == labels).astype(int))
+                
+                envs = runner.active()
             
             # Bilježenje rezultata epizode
             avg_loss = np.mean(episode_loss)
@@ -608,8 +1186,7 @@ class DDQNAgent:
                     history["best_model_episode"] = episode + 1
                     
                     # Spremanje najboljeg modela
-                    best_model_path = MODEL_DIR / "ddqn_best_model.h5"
-                    self.save(str(best_model_path))
+                    self.save(str(best_model_path), export_tflite=False)
                     
                     print(f"  Novi najbolji model spremljen! Val Accuracy: {val_acc:.4f}")
                     
@@ -619,7 +1196,6 @@ class DDQNAgent:
                     break
         
         # Na kraju treninga, učitaj najbolji model
-        best_model_path = MODEL_DIR / "ddqn_best_model.h5"
         if best_model_path.exists():
             self.load(str(best_model_path))
             print(f"Učitan najbolji model iz epizode {history['best_model_episode']}.")
@@ -660,13 +1236,11 @@ class DDQNAgent:
                 X_val = np.reshape(X_val, [-1, self.input_dim])
         
         # Izračun loss-a i točnosti
-        q_values = self.model.predict(X_val)
+        q_values = self._predict_batched(X_val)
         predictions = np.argmax(q_values, axis=1)
         
-        # MSE loss
-        targets = np.zeros_like(q_values)
-        for i, label in enumerate(y_val):
-            targets[i, label] = 1
+        # MSE loss (one-hot targeti)
+        targets = np.eye(self.action_size, dtype=np.float32)[np.asarray(y_val, dtype=np.int64)]
         loss = np.mean(np.square(q_values - targets))
         
         # Accuracy
@@ -691,15 +1265,155 @@ class DDQNAgent:
             action = self.simplified_agent.act(state)
             return action, [0.5, 0.5]  # Pojednostavljene Q-vrijednosti
             
-        # Reshape stanja ako je potrebno
-        if NUMPY_AVAILABLE and isinstance(state, np.ndarray):
-            if len(state.shape) < 2:
-                state = np.reshape(state, [1, self.input_dim])
+        # Kvantizirani model za inferenciju, ako je učitan
+        if self._tflite is not None:
+            q_values = self.predict_quantized(state)
+            return np.argmax(q_values), q_values.tolist()
         
-        q_values = self.model.predict(state)[0]
+        # Reshape stanja ako je potrebno (graf očekuje float32 oblika (N, input_dim))
+        state = np.reshape(np.asarray(state, dtype=np.float32), [-1, self.input_dim])
+        
+        q_values = self._infer_fn(state).numpy()[0]
         action = np.argmax(q_values)
         
         return action, q_values.tolist()
+    
+    def predict_batch(self, states):
+        """
+        Predviđa akcije i Q-vrijednosti za više stanja jednim pozivom modela.
+        
+        Args:
+            states: Matrica stanja (N x input_dim)
+        
+        Returns:
+            tuple: (akcije, q_vrijednosti) - niz akcija i lista Q-vrijednosti po stanju
+        """
+        if not TF_AVAILABLE:
+            actions = np.asarray(self.simplified_agent.act_batch(states))
+            return actions, [[0.5, 0.5] for _ in range(len(actions))]
+        
+        # Kvantizirani model, ako je učitan (jedan poziv interpretera za cijeli batch)
+        if self._tflite is not None:
+            q_values = self.predict_quantized_batch(states)
+            return np.argmax(q_values, axis=1), q_values.tolist()
+        
+        states = np.reshape(np.asarray(states, dtype=np.float32), [-1, self.input_dim])
+        
+        q_values = self._infer_fn(states).numpy()
+        actions = np.argmax(q_values, axis=1)
+        
+        return actions, q_values.tolist()
+
+
+def _train_sub_agent(args):
+    """
+    Trenira jednog pod-agenta ansambla (u zasebnom procesu).
+    
+    Args:
+        args: Tuple (dataset particije, putanja dataset-a, argumenti agenta,
+            argumenti treninga)
+        
+    Returns:
+        tuple: (težine modela, epsilon, povijest treninga)
+    """
+    dataset, dataset_path, agent_kwargs, train_kwargs = args
+    
+    loader = DDQNDataLoader(dataset_path=dataset_path)
+    loader.dataset = dataset
+    
+    agent = DDQNAgent(**agent_kwargs)
+    history = agent.train(loader, **train_kwargs)
+    return agent.model.get_weights(), agent.epsilon, history
+
+
+class DDQNEnsemble:
+    """
+    Ansambl DDQN pod-agenata. Svaki pod-agent trenira se na vlastitoj
+    particiji dataset-a (prema tipu napada), neovisno o ostalima, pa se
+    trening može izvoditi paralelno u zasebnim procesima. Pri predikciji
+    agregator uprosječuje Q-vrijednosti svih pod-agenata.
+    """
+    
+    def __init__(self, num_agents=3, state_size=8, action_size=2, window_size=1):
+        """
+        Inicijalizacija ansambla.
+        
+        Args:
+            num_agents: Broj pod-agenata (particija dataset-a)
+            state_size: Veličina ulaznog stanja (broj značajki)
+            action_size: Broj mogućih akcija (2: nema napada, ima napada)
+            window_size: Veličina vremenskog prozora za ulaz
+        """
+        self.num_agents = num_agents
+        self.agent_kwargs = {
+            "state_size": state_size,
+            "action_size": action_size,
+            "window_size": window_size
+        }
+        self.sub_agents = [DDQNAgent(**self.agent_kwargs) for _ in range(num_agents)]
+    
+    def train(self, dataset_loader, parallel=True, **train_kwargs):
+        """
+        Trenira sve pod-agente, svakog na njegovoj particiji dataset-a.
+        
+        Args:
+            dataset_loader: Loader za dataset
+            parallel: Zastavica za trening u zasebnim procesima
+            **train_kwargs: Argumenti za DDQNAgent.train
+            
+        Returns:
+            list: Povijesti treninga pod-agenata
+        """
+        if not TF_AVAILABLE:
+            print("TensorFlow nije dostupan, trening nije moguć.")
+            return None
+        
+        # Provjeri je li dataset učitan
+        if not dataset_loader.dataset:
+            success = dataset_loader.load()
+            if not success:
+                print("Učitavanje dataset-a nije uspjelo.")
+                return None
+        
+        jobs = []
+        for k in range(self.num_agents):
+            partition = dataset_loader.get_partition(k, self.num_agents)
+            kwargs = dict(train_kwargs, checkpoint_path=str(MODEL_DIR / f"ddqn_best_model_part{k}.h5"))
+            jobs.append((partition.dataset, dataset_loader.dataset_path, self.agent_kwargs, kwargs))
+        
+        if parallel and self.num_agents > 1:
+            # Pod-agenti ne razmjenjuju težine, pa je trening neovisan po procesu
+            ctx = multiprocessing.get_context("spawn")
+            with ctx.Pool(self.num_agents) as pool:
+                results = pool.map(_train_sub_agent, jobs)
+            
+            histories = []
+            for agent, (weights, epsilon, history) in zip(self.sub_agents, results):
+                agent.model.set_weights(weights)
+                agent.update_target_model()
+                agent.epsilon = epsilon
+                histories.append(history)
+            return histories
+        
+        histories = []
+        for agent, (dataset, dataset_path, _, kwargs) in zip(self.sub_agents, jobs):
+            loader = DDQNDataLoader(dataset_path=dataset_path)
+            loader.dataset = dataset
+            histories.append(agent.train(loader, **kwargs))
+        return histories
+    
+    def predict(self, state):
+        """
+        Predviđa akciju na temelju prosječnih Q-vrijednosti pod-agenata.
+        
+        Args:
+            state: Stanje za predikciju
+            
+        Returns:
+            tuple: (akcija, q_vrijednosti)
+        """
+        q_values = np.mean([agent.predict(state)[1] for agent in self.sub_agents], axis=0)
+        return np.argmax(q_values), q_values.tolist()
 
 
 # Pomoćna funkcija za testiranje
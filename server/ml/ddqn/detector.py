@@ -13,6 +13,9 @@ import sys
 import json
 import time
 import math
+import threading
+from math import log2
+from collections import Counter, deque
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -27,6 +30,14 @@ except ImportError:
     NUMPY_AVAILABLE = False
     print("Warning: NumPy not available, using basic Python lists instead")
 
+# Numba je opcionalan i koristi se samo za ubrzanje izračuna značajki
+NUMBA_AVAILABLE = False
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    pass
+
 # Import iz naših modula
 try:
     from ml.ddqn.dataset_loader import DDQNDataLoader
@@ -40,6 +51,50 @@ MODEL_DIR.mkdir(exist_ok=True)
 DEFAULT_MODEL_PATH = MODEL_DIR / "ddqn_best_model.h5"
 SIMPLIFIED_MODEL_PATH = MODEL_DIR / "ddqn_best_model_simplified.json"
 
+# Maksimalan broj prozora prometa koji se čuvaju u povijesti
+MAX_TRAFFIC_HISTORY = 1000
+
+# Recipročne vrijednosti normalizacijskih konstanti značajki (množenje umjesto dijeljenja)
+_INV_BYTES = 1 / 1_000_000  # volumen prometa u bajtovima
+_INV_RATE = 1 / 500.0       # paketi po sekundi
+_INV_SRC = 1 / 100.0        # broj jedinstvenih izvorišnih IP adresa
+_INV_DST = 1 / 50.0         # broj jedinstvenih odredišnih IP adresa
+
+# Početni kapacitet međuspremnika za brojanje i najveći broj interniranih ključeva po mapi
+_ENT_BUFFER_SIZE = 4096
+_MAX_INTERNED_KEYS = 65536
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True)
+    def _entropy_kernel(counts, n):
+        """
+        Kompilirani izračun normalizirane Shannon entropije iz frekvencija.
+        """
+        k = counts.shape[0]
+        if n <= 0 or k <= 1:
+            return 0.0
+        acc = 0.0
+        for i in range(k):
+            c = float(counts[i])
+            acc += c * math.log(c)
+        return (math.log(n) - acc / n) / math.log(k)
+
+    @numba.njit(cache=True)
+    def _finalize_features(src_counts, dst_counts, proto_counts, syn_count, total_packet_size, total_packets):
+        """
+        Kompilirani izračun vektora od 8 značajki iz prebrojanih frekvencija i suma.
+        """
+        features = np.empty(8)
+        features[0] = _entropy_kernel(src_counts, total_packets)
+        features[1] = _entropy_kernel(dst_counts, total_packets)
+        features[2] = syn_count / total_packets
+        features[3] = min(1.0, total_packet_size * _INV_BYTES)
+        features[4] = min(1.0, total_packets * _INV_RATE)
+        features[5] = min(1.0, src_counts.shape[0] * _INV_SRC)
+        features[6] = min(1.0, dst_counts.shape[0] * _INV_DST)
+        features[7] = 1.0 if proto_counts.shape[0] > 1 else 0.0
+        return features
+
 class DDQNDetector:
     """
     DDQN detektor napada koji može raditi u dva moda:
@@ -49,6 +104,34 @@ class DDQNDetector:
     Detektor koristi DDQN (Double Deep Q-Network) za detekciju DDoS napada.
     """
     
+    # Težine značajki za procjenu težine napada; (1 - destination_entropy) * 0.05
+    # je rastavljen na težinu -0.05 i pomak 0.05
+    _SEV_WEIGHTS = np.array([0.1, -0.05, 0.15, 0.4, 0.3, 0.0, 0.0, 0.0]) if NUMPY_AVAILABLE else None
+    _SEV_BIAS = 0.05
+    
+    # Pravila za procjenu tipa napada (redoslijed je prioritet; prvo zadovoljeno pravilo pobjeđuje).
+    # Predznak +1 znači "značajka > prag", -1 "značajka < prag", 0 da se značajka ne provjerava.
+    # Redoslijed značajki: source_entropy, destination_entropy, syn_ratio, traffic_volume,
+    # packet_rate, unique_src_count, unique_dst_count, protocol_imbalance
+    _RULE_NAMES = ["TCP SYN Flood", "UDP Flood", "ICMP Flood", "Distributed Flood", "HTTP Flood", "Slowloris"]
+    if NUMPY_AVAILABLE:
+        _RULE_THRESHOLDS = np.array([
+            [0.0, 0.0, 0.6, 0.0, 0.0, 0.0, 0.0, 0.0],
+            [0.0, 0.0, 0.0, 0.0, 0.7, 0.0, 0.0, 0.3],
+            [0.0, 0.2, 0.0, 0.0, 0.6, 0.0, 0.0, 0.0],
+            [0.0, 0.0, 0.0, 0.7, 0.0, 0.6, 0.0, 0.0],
+            [0.0, 0.0, 0.3, 0.5, 0.0, 0.0, 0.0, 0.0],
+            [0.0, 0.0, 0.0, 0.4, 0.4, 0.0, 0.0, 0.0],
+        ])
+        _RULE_SIGNS = np.array([
+            [0, 0, 1, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 1, 0, 0, -1],
+            [0, -1, 0, 0, 1, 0, 0, 0],
+            [0, 0, 0, 1, 0, 1, 0, 0],
+            [0, 0, -1, 1, 0, 0, 0, 0],
+            [0, 0, 0, -1, -1, 0, 0, 0],
+        ], dtype=np.int8)
+    
     def __init__(self, model_path=None, window_size=5, online_learning=True):
         """
         Inicijalizacija detektora.
@@ -62,12 +145,26 @@ class DDQNDetector:
         self.model_path = model_path
         self.online_learning = online_learning
         self.agent = None
-        self.traffic_history = []
+        self.traffic_history = deque(maxlen=MAX_TRAFFIC_HISTORY)
         self.attack_history = []
         self.last_attack_time = None
         self.last_attack_type = None
         self.attack_in_progress = False
         self.current_attack_severity = 0.0
+        self._current_attack_start = None
+        
+        # Zadnjih 5 napada za rezultat detekcije; ponovno se računa samo kad se doda novi napad
+        self._recent_attacks = []
+        self._recent_attacks_dirty = False
+        
+        # Značajke zadnjih window_size prozora prometa (svaki se prozor predobrađuje samo jednom)
+        self._feature_cache = deque(maxlen=window_size)
+        
+        # Unaprijed alocirani vektor stanja (window_size * 8), pomiče se na mjestu pri svakom novom prozoru
+        self._state_buf = np.zeros(window_size * 8, dtype=np.float32) if NUMPY_AVAILABLE else None
+        
+        # Mape vrijednost -> cjelobrojni ID i međuspremnik brojača za izračun entropije
+        self._reset_interning()
         
         # Inicijaliziraj dataset loader za batch učenje
         self.dataset_loader = DDQNDataLoader()
@@ -125,55 +222,46 @@ class DDQNDetector:
         
         # Izvlačenje potrebnih značajki
         try:
-            # Osnovne značajke
-            source_ips = [packet.get("src_ip", "unknown") for packet in traffic_data]
-            destination_ips = [packet.get("dst_ip", "unknown") for packet in traffic_data]
-            
-            unique_src_ips = set(source_ips)
-            unique_dst_ips = set(destination_ips)
-            
-            # Računanje značajki
-            protocol_counts = {}
-            syn_count = 0
-            total_packet_size = 0
-            
-            for packet in traffic_data:
-                protocol = packet.get("protocol", "unknown")
-                protocol_counts[protocol] = protocol_counts.get(protocol, 0) + 1
-                
-                # SYN paketi
-                if packet.get("tcp_flags") == "S":
-                    syn_count += 1
-                
-                # Veličina paketa
-                packet_size = packet.get("packet_size", 0)
-                total_packet_size += packet_size
+            # Jedan prolaz kroz pakete: frekvencije IP adresa i protokola te skalarne sume
+            src_counts, dst_counts, proto_counts, syn_count, total_packet_size = self._count_packets(traffic_data)
             
             # Normalizacija značajki
             total_packets = len(traffic_data)
             
+            if NUMBA_AVAILABLE and NUMPY_AVAILABLE:
+                # Cijeli numerički dio u jednom kompiliranom pozivu
+                return _finalize_features(
+                    src_counts, dst_counts, proto_counts,
+                    syn_count, float(total_packet_size), total_packets
+                ).tolist()
+            
             # Shannon entropija izvorišnih IP adresa
-            source_entropy = self._calculate_entropy(source_ips)
+            source_entropy = self._entropy_from_counts(src_counts, total_packets)
             
             # Shannon entropija odredišnih IP adresa
-            destination_entropy = self._calculate_entropy(destination_ips)
+            destination_entropy = self._entropy_from_counts(dst_counts, total_packets)
             
-            # Omjer SYN paketa
-            syn_ratio = syn_count / total_packets if total_packets > 0 else 0
+            # Omjer SYN paketa (total_packets > 0 jer traffic_data nije prazan)
+            syn_ratio = syn_count / total_packets
             
             # Normalizacija prometa (logaritamska)
-            traffic_volume = min(1.0, total_packet_size / 1000000) if total_packet_size > 0 else 0
+            traffic_volume = total_packet_size * _INV_BYTES
+            traffic_volume = traffic_volume if traffic_volume < 1.0 else 1.0
             
-            # Stopa paketa (paketi po sekundi)
-            time_span = 1.0  # Pretpostavljamo da su podaci za 1 sekundu
-            packet_rate = min(1.0, total_packets / (500 * time_span)) if time_span > 0 else 0
+            # Stopa paketa (paketi po sekundi; pretpostavljamo da su podaci za 1 sekundu)
+            packet_rate = total_packets * _INV_RATE
+            packet_rate = packet_rate if packet_rate < 1.0 else 1.0
             
-            # Broj jedinstvenih izvorišnih i odredišnih IP adresa
-            unique_src_count = min(1.0, len(unique_src_ips) / 100) if unique_src_ips else 0
-            unique_dst_count = min(1.0, len(unique_dst_ips) / 50) if unique_dst_ips else 0
+            # Broj jedinstvenih izvorišnih i odredišnih IP adresa (broj prebrojanih vrijednosti,
+            # bez zasebnog skupa; nikad nije nula jer traffic_data nije prazan)
+            unique_src_count = len(src_counts) * _INV_SRC
+            unique_src_count = unique_src_count if unique_src_count < 1.0 else 1.0
+            unique_dst_count = len(dst_counts) * _INV_DST
+            unique_dst_count = unique_dst_count if unique_dst_count < 1.0 else 1.0
             
-            # Mjera neravnoteže u distribuciji protokola
-            protocol_imbalance = self._calculate_entropy(list(protocol_counts.keys()))
+            # Mjera neravnoteže u distribuciji protokola (entropija skupa različitih protokola,
+            # koja je maksimalna čim postoji više od jednog protokola)
+            protocol_imbalance = 1.0 if len(proto_counts) > 1 else 0.0
             
             # Stvaranje vektora značajki
             features = [
@@ -193,6 +281,121 @@ class DDQNDetector:
             print(f"Greška pri predobradi podataka: {e}")
             return [0.0] * 8
     
+    def _reset_interning(self):
+        """
+        Prazni mape interniranih vrijednosti i (ponovno) alocira međuspremnik brojača.
+        """
+        self._id_of_src = {}
+        self._id_of_dst = {}
+        self._id_of_proto = {}
+        self._ent_counts = np.zeros((3, _ENT_BUFFER_SIZE), dtype=np.int64) if NUMPY_AVAILABLE else None
+    
+    def _count_packets(self, traffic_data):
+        """
+        Jednim prolazom broji izvorišne/odredišne IP adrese i protokole te zbraja
+        SYN pakete i veličinu paketa.
+        
+        Uz NumPy se vrijednosti interniraju u cjelobrojne ID-jeve koji traju između
+        poziva, a frekvencije se zbrajaju u unaprijed alocirani međuspremnik.
+        
+        Args:
+            traffic_data: Podaci o prometu
+            
+        Returns:
+            tuple: (frekvencije izvora, frekvencije odredišta, frekvencije protokola,
+                    broj SYN paketa, ukupna veličina paketa)
+        """
+        syn_count = 0
+        total_packet_size = 0
+        
+        if not NUMPY_AVAILABLE:
+            src_ctr = Counter()
+            dst_ctr = Counter()
+            proto_ctr = Counter()
+            
+            for packet in traffic_data:
+                src_ctr[packet.get("src_ip", "unknown")] += 1
+                dst_ctr[packet.get("dst_ip", "unknown")] += 1
+                proto_ctr[packet.get("protocol", "unknown")] += 1
+                
+                # SYN paketi
+                if packet.get("tcp_flags") == "S":
+                    syn_count += 1
+                
+                # Veličina paketa
+                total_packet_size += packet.get("packet_size", 0)
+            
+            return list(src_ctr.values()), list(dst_ctr.values()), list(proto_ctr.values()), syn_count, total_packet_size
+        
+        # Ograniči rast mapa kod dugotrajnog rada s mnogo različitih adresa
+        if max(len(self._id_of_src), len(self._id_of_dst)) > _MAX_INTERNED_KEYS:
+            self._reset_interning()
+        
+        src_map = self._id_of_src
+        dst_map = self._id_of_dst
+        proto_map = self._id_of_proto
+        src_ids = []
+        dst_ids = []
+        proto_ids = []
+        
+        for packet in traffic_data:
+            key = packet.get("src_ip", "unknown")
+            idx = src_map.get(key)
+            if idx is None:
+                idx = src_map[key] = len(src_map)
+            src_ids.append(idx)
+            
+            key = packet.get("dst_ip", "unknown")
+            idx = dst_map.get(key)
+            if idx is None:
+                idx = dst_map[key] = len(dst_map)
+            dst_ids.append(idx)
+            
+            key = packet.get("protocol", "unknown")
+            idx = proto_map.get(key)
+            if idx is None:
+                idx = proto_map[key] = len(proto_map)
+            proto_ids.append(idx)
+            
+            # SYN paketi
+            if packet.get("tcp_flags") == "S":
+                syn_count += 1
+            
+            # Veličina paketa
+            total_packet_size += packet.get("packet_size", 0)
+        
+        return (
+            self._live_counts(0, src_ids, len(src_map)),
+            self._live_counts(1, dst_ids, len(dst_map)),
+            self._live_counts(2, proto_ids, len(proto_map)),
+            syn_count,
+            total_packet_size
+        )
+    
+    def _live_counts(self, row, ids, num_keys):
+        """
+        Zbraja ID-jeve u redak međuspremnika i vraća frekvencije vrijednosti koje
+        su se pojavile u trenutnom prozoru. Nakon toga se nulira samo živi dio retka.
+        
+        Args:
+            row: Redak međuspremnika (0 - izvori, 1 - odredišta, 2 - protokoli)
+            ids: ID-jevi vrijednosti iz trenutnog prozora
+            num_keys: Broj interniranih vrijednosti u pripadnoj mapi
+            
+        Returns:
+            np.ndarray: Frekvencije (samo pozitivne)
+        """
+        if num_keys > self._ent_counts.shape[1]:
+            # Proširi međuspremnik (rijetko, samo kad broj ključeva prijeđe kapacitet)
+            grown = np.zeros((3, max(num_keys, 2 * self._ent_counts.shape[1])), dtype=np.int64)
+            self._ent_counts = grown
+        
+        live = self._ent_counts[row, :num_keys]
+        np.add.at(live, ids, 1)
+        counts = live[live > 0]
+        live[:] = 0
+        return counts
+    
     def _calculate_entropy(self, values):
         """
         Izračunava Shannon entropiju za listu vrijednosti.
@@ -205,25 +408,50 @@ class DDQNDetector:
         """
         if not values:
             return 0.0
+        
+        # np.unique se koristi samo za brojčana polja: miješani tipovi daju object
+        # polje (None uz nizove ne može se sortirati) ili se pretvaraju u nizove
+        # (1 i '1' bi pali u isti razred); takve vrijednosti broji Counter
+        array = np.asarray(values) if NUMPY_AVAILABLE else None
+        if array is not None and array.dtype.kind in "biuf":
+            # Vektorizirani izračun frekvencija i entropije
+            _, counts = np.unique(array, return_counts=True)
+            k = len(counts)
+            if k <= 1:
+                return 0.0
+            # H = ln(n) - sum(c * ln(c)) / n u natima; normalizacija s ln(k) daje isti
+            # omjer kao u bitovima, pa pretvorba faktorom 1/ln(2) nije potrebna
+            n = counts.sum()
+            entropy = math.log(n) - np.dot(counts, np.log(counts)) / n
+            return float(entropy / math.log(k))
+        
+        # Računamo frekvencije i entropiju iz prebrojanih vrijednosti
+        return self._entropy_from_counts(list(Counter(values).values()), len(values))
+    
+    def _entropy_from_counts(self, counts, n):
+        """
+        Izračunava normaliziranu Shannon entropiju izravno iz prebrojanih frekvencija.
+        
+        Args:
+            counts: Frekvencije pojedinih vrijednosti (lista ili NumPy polje)
+            n: Ukupan broj vrijednosti
             
-        # Računamo frekvencije
-        freq_dict = {}
-        for val in values:
-            freq_dict[val] = freq_dict.get(val, 0) + 1
-            
-        # Izračun entropije
-        entropy = 0.0
-        n = len(values)
-        for count in freq_dict.values():
-            p = count / n
-            if p > 0:
-                entropy -= p * math.log2(p)
-            
-        # Normalizacija na raspon [0, 1]
-        max_entropy = math.log2(len(freq_dict)) if freq_dict else 0
-        if max_entropy > 0:
-            return entropy / max_entropy
-        return 0.0
+        Returns:
+            Normalizirana Shannon entropija [0, 1]
+        """
+        k = len(counts)
+        if n <= 0 or k <= 1:
+            return 0.0
+        
+        # H = log(n) - sum(c * log(c)) / n, bez zasebnog računanja p = c / n
+        if NUMPY_AVAILABLE:
+            # Prirodni logaritam (np.log ima SIMD implementaciju); baza se krati pri normalizaciji
+            counts = np.asarray(counts, dtype=np.float64)
+            entropy = math.log(n) - float(np.dot(counts, np.log(counts))) / n
+            return entropy / math.log(k)
+        
+        entropy = log2(n) - sum(c * log2(c) for c in counts) / n
+        return entropy / log2(k)
     
     def detect(self, traffic_data, learn=True):
         """
@@ -240,39 +468,101 @@ class DDQNDetector:
         # Provjeri je li agent inicijaliziran
         if not self.agent:
             self._init_model()
+        
+        features, state = self._push_window(traffic_data)
+        
+        # Detekcija napada pomoću DDQN agenta
+        action, q_values = self.agent.predict(state)
+        
+        return self._handle_prediction(features, state, action, q_values, learn)
+    
+    def detect_batch(self, traffic_data_batch, learn=True):
+        """
+        Detektira napade za niz uzastopnih prozora prometa jednim pozivom modela.
+        Stanja svih prozora slažu se u matricu (N, window_size * 8) i evaluiraju
+        odjednom, a ažuriranje stanja napada i online učenje provode se redom.
+        
+        Args:
+            traffic_data_batch: Lista podataka o prometu (jedan element po prozoru)
+            learn: Zastavica za učenje iz novih podataka
             
-        # Dodaj trenutne podatke u povijest
-        self.traffic_history.append(traffic_data)
+        Returns:
+            list: Rezultati detekcije za svaki prozor
+        """
+        if not traffic_data_batch:
+            return []
         
-        # Ograniči povijest na zadnjih N paketa
-        max_history = 1000
-        if len(self.traffic_history) > max_history:
-            self.traffic_history = self.traffic_history[-max_history:]
+        # Provjeri je li agent inicijaliziran
+        if not self.agent:
+            self._init_model()
         
-        # Predobradi podatke za posljednjih X paketa
-        current_window = self.traffic_history[-self.window_size:] if len(self.traffic_history) >= self.window_size else self.traffic_history
+        # Pomakni prozor za svaki element i zapamti kopiju stanja
+        windows = []
+        for traffic_data in traffic_data_batch:
+            features, state = self._push_window(traffic_data)
+            windows.append((features, np.array(state, dtype=np.float32) if NUMPY_AVAILABLE else state))
+        
+        # Jedan poziv modela za sva stanja
+        if NUMPY_AVAILABLE and hasattr(self.agent, 'predict_batch'):
+            states = np.stack([state for _, state in windows], axis=0)
+            actions, q_values = self.agent.predict_batch(states)
+            predictions = zip(actions, q_values)
+        else:
+            predictions = [self.agent.predict(state) for _, state in windows]
         
-        # Za svaki prozor računamo značajke
-        features = []
-        for i in range(min(self.window_size, len(current_window))):
-            window_data = current_window[i]
-            window_features = self.preprocess_traffic_data(window_data)
-            features.append(window_features)
+        return [
+            self._handle_prediction(features, state, action, q, learn)
+            for (features, state), (action, q) in zip(windows, predictions)
+        ]
+    
+    def _push_window(self, traffic_data):
+        """
+        Dodaje novi prozor prometa u povijest i vraća značajke i stanje za model.
         
-        # Dopuni značajke ako nemamo dovoljno povijesti
-        while len(features) < self.window_size:
-            features.insert(0, features[0] if features else [0.0] * 8)
+        Args:
+            traffic_data: Podaci o trenutnom mrežnom prometu
+            
+        Returns:
+            tuple: (značajke zadnjih window_size prozora, vektor stanja)
+        """
+        # Dodaj trenutne podatke u povijest (deque automatski zadržava zadnjih N prozora)
+        self.traffic_history.append(traffic_data)
+        
+        # Predobradi samo najnovije podatke; značajke ranijih prozora su već u cache-u
+        new_features = self.preprocess_traffic_data(traffic_data)
+        self._feature_cache.append(new_features)
+        features = list(self._feature_cache)
+        
+        # Dopuni značajke nulama ako nemamo dovoljno povijesti
+        if len(features) < self.window_size:
+            features = [[0.0] * 8 for _ in range(self.window_size - len(features))] + features
         
         # Pretvori značajke u format za model
         if NUMPY_AVAILABLE:
-            state = np.array(features).flatten()
+            # Pomakni stanje za jedan prozor ulijevo i upiši nove značajke na kraj (bez nove alokacije)
+            state = self._state_buf
+            state[:-8] = state[8:]
+            state[-8:] = new_features
         else:
             # Flatten lista bez NumPy
             state = [item for sublist in features for item in sublist]
         
-        # Detekcija napada pomoću DDQN agenta
-        action, q_values = self.agent.predict(state)
+        return features, state
+    
+    def _handle_prediction(self, features, state, action, q_values, learn):
+        """
+        Ažurira stanje napada i online učenje na temelju predikcije agenta.
         
+        Args:
+            features: Značajke zadnjih window_size prozora
+            state: Vektor stanja predan modelu
+            action: Akcija koju je odabrao agent
+            q_values: Q-vrijednosti agenta
+            learn: Zastavica za učenje iz novih podataka
+            
+        Returns:
+            dict: Rezultati detekcije
+        """
         # Provjera je li detektiran napad
         is_attack = action == 1
         
@@ -288,12 +578,14 @@ class DDQNDetector:
             if not self.attack_in_progress:
                 self.attack_in_progress = True
                 self.last_attack_time = now
+                self._current_attack_start = now
                 
                 # Procijeni tip napada na temelju značajki
                 attack_type = self._estimate_attack_type(features[-1])
                 self.last_attack_type = attack_type
                 
                 # Zabilježi napad
+                self._recent_attacks_dirty = True
                 self.attack_history.append({
                     "start_time": now.isoformat(),
                     "type": attack_type,
@@ -325,8 +617,8 @@ class DDQNDetector:
                     if self.attack_history:
                         self.attack_history[-1]["end_time"] = now.isoformat()
                         
-                        # Računanje trajanja napada
-                        start_time = datetime.fromisoformat(self.attack_history[-1]["start_time"])
+                        # Računanje trajanja napada (iz spremljenog početka, bez parsiranja ISO zapisa)
+                        start_time = self._current_attack_start or datetime.fromisoformat(self.attack_history[-1]["start_time"])
                         duration = (now - start_time).total_seconds()
                         self.attack_history[-1]["duration"] = duration
         
@@ -349,6 +641,12 @@ class DDQNDetector:
                 if hasattr(self.agent, 'replay') and len(getattr(self.agent, 'memory', [])) >= 32:
                     self.agent.replay(32)
         
+        # Zadnji napadi se režu iz povijesti samo kad je dodan novi napad; ažuriranja
+        # postojećih zapisa su vidljiva jer lista dijeli iste rječnike
+        if self._recent_attacks_dirty:
+            self._recent_attacks = self.attack_history[-5:]
+            self._recent_attacks_dirty = False
+        
         # Izgradnja rezultata
         result = {
             "timestamp": now.isoformat(),
@@ -358,14 +656,18 @@ class DDQNDetector:
             "q_values": q_values,
             "attack_in_progress": self.attack_in_progress,
             "features": features[-1],
-            "current_attack": {
+            "current_attack": None,
+            "recent_attacks": self._recent_attacks
+        }
+        
+        # Podaci o trenutnom napadu grade se samo dok je napad u tijeku
+        if self.attack_in_progress:
+            result["current_attack"] = {
                 "type": self.last_attack_type,
                 "start_time": self.last_attack_time.isoformat() if self.last_attack_time else None,
                 "duration": (now - self.last_attack_time).total_seconds() if self.last_attack_time else 0,
                 "severity": self.current_attack_severity
-            } if self.attack_in_progress else None,
-            "recent_attacks": self.attack_history[-5:] if self.attack_history else []
-        }
+            }
         
         return result
     
@@ -379,6 +681,14 @@ class DDQNDetector:
         Returns:
             str: Procijenjeni tip napada
         """
+        if NUMPY_AVAILABLE:
+            # Sva pravila se provjeravaju odjednom; argmax vraća prvo zadovoljeno pravilo
+            arr = np.asarray(features, dtype=np.float64)
+            checks = np.where(self._RULE_SIGNS > 0, arr > self._RULE_THRESHOLDS, arr < self._RULE_THRESHOLDS)
+            matches = np.all(checks | (self._RULE_SIGNS == 0), axis=1)
+            idx = int(np.argmax(matches))
+            return self._RULE_NAMES[idx] if matches[idx] else "Unknown Attack"
+        
         # Raspakiranje značajki
         source_entropy, destination_entropy, syn_ratio, traffic_volume, packet_rate, unique_src_count, unique_dst_count, protocol_imbalance = features
         
@@ -408,6 +718,12 @@ class DDQNDetector:
         Returns:
             float: Procjena težine napada [0, 1]
         """
+        if NUMPY_AVAILABLE:
+            # Skalarni produkt s vektorom težina umjesto pojedinačnih množenja
+            arr = features if isinstance(features, np.ndarray) else np.asarray(features, dtype=np.float64)
+            severity = float(arr @ self._SEV_WEIGHTS) + self._SEV_BIAS
+            return severity if severity < 1.0 else 1.0
+        
         # Raspakiranje značajki
         source_entropy, destination_entropy, syn_ratio, traffic_volume, packet_rate, unique_src_count, unique_dst_count, protocol_imbalance = features
         
@@ -491,6 +807,18 @@ class DDQNDetector:
             return metrics
         else:
             # Evaluacija na dostavljenim testnim podacima
+            if NUMPY_AVAILABLE:
+                # Značajke se upisuju izravno u unaprijed alociranu matricu
+                n = len(test_data)
+                processed_data = np.empty((n, 8), dtype=np.float32)
+                for i, sample in enumerate(test_data):
+                    processed_data[i] = self.preprocess_traffic_data(sample["data"])
+                labels = np.fromiter(
+                    (1 if sample.get("is_attack", False) else 0 for sample in test_data),
+                    dtype=np.int8, count=n
+                )
+                return self.agent.evaluate(processed_data, labels)
+            
             processed_data = []
             labels = []
             
@@ -501,22 +829,24 @@ class DDQNDetector:
                 processed_data.append(features)
                 labels.append(1 if is_attack else 0)
             
-            if NUMPY_AVAILABLE:
-                processed_data = np.array(processed_data)
-                labels = np.array(labels)
-            
             return self.agent.evaluate(processed_data, labels)
     
     def reset(self):
         """
         Resetira stanje detektora.
         """
-        self.traffic_history = []
+        self.traffic_history.clear()
+        self._feature_cache.clear()
+        if self._state_buf is not None:
+            self._state_buf.fill(0.0)
         self.attack_history = []
+        self._recent_attacks = []
+        self._recent_attacks_dirty = False
         self.last_attack_time = None
         self.last_attack_type = None
         self.attack_in_progress = False
         self.current_attack_severity = 0.0
+        self._current_attack_start = None
         print("Stanje detektora resetirano.")
     
     def get_attack_history(self, limit=10):
@@ -637,18 +967,28 @@ class DDQNDetector:
 
 # Globalna instanca detektora
 _detector_instance = None
+_detector_lock = threading.Lock()
 
 def get_detector(online_learning=True):
     """
     Vraća globalnu instancu detektora.
     
+    Instanca se stvara samo jednom i pod zaključavanjem (dvostruka provjera),
+    pa istovremeni zahtjevi ne grade više detektora; nakon toga se vraća bez
+    zaključavanja.
+    
     Args:
-        online_learning: Zastavica za online učenje
+        online_learning: Zastavica za online učenje (koristi se samo pri prvom pozivu)
         
     Returns:
         DDQNDetector: Instanca detektora
     """
     global _detector_instance
-    if _detector_instance is None:
-        _detector_instance = DDQNDetector(online_learning=online_learning)
-    return _detector_instance
\ No newline at end of file
+    instance = _detector_instance
+    if instance is not None:
+        return instance
+    
+    with _detector_lock:
+        if _detector_instance is None:
+            _detector_instance = DDQNDetector(online_learning=online_learning)
+        return _detector_instance
@@ -0,0 +1,89 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Cython jezgra za izračun značajki prometa iz stupaca Python lista.
+Koristi se kada NumPy nije dostupan; kompilira se pri prvom korištenju
+putem pyximport (zastavice kompajlera su u _ddos_features.pyxbld).
+"""
+
+from libc.math cimport log2
+
+
+cdef double _entropy_c(list values, Py_ssize_t *unique) except -1:
+    """
+    Normalizirana Shannon entropija; u unique upisuje broj različitih vrijednosti.
+    """
+    cdef dict freq = {}
+    cdef object value
+    cdef Py_ssize_t n = len(values)
+    cdef Py_ssize_t k, c
+    cdef double acc = 0.0
+
+    for value in values:
+        freq[value] = freq.get(value, 0) + 1
+
+    k = len(freq)
+    unique[0] = k
+    if k <= 1:
+        return 0.0
+
+    # H = log2(n) - Σ c·log2(c) / n, normalizirano s log2(k)
+    for count in freq.values():
+        c = count
+        acc += c * log2(c)
+    return (log2(n) - acc / n) / log2(k)
+
+
+def entropy(list values):
+    """
+    Izračunava normaliziranu Shannon entropiju za listu vrijednosti.
+
+    Args:
+        values: Lista vrijednosti
+
+    Returns:
+        float: Normalizirana Shannon entropija [0, 1]
+    """
+    cdef Py_ssize_t unique
+    return _entropy_c(values, &unique)
+
+
+def extract_features(list src, list dst, list proto, list syn, list size):
+    """
+    Računa vektor od 8 značajki iz stupaca paketa (packets_to_lists).
+
+    Args:
+        src, dst, proto: Izvorišne i odredišne IP adrese te protokoli paketa
+        syn: Je li paket SYN (bool)
+        size: Veličine paketa
+
+    Returns:
+        list: Vektor značajki
+    """
+    cdef Py_ssize_t n = len(src)
+    cdef Py_ssize_t i, unique_src, unique_dst
+    cdef Py_ssize_t syn_count = 0
+    cdef double total_packet_size = 0.0
+    cdef double source_entropy, destination_entropy
+
+    if n == 0:
+        return [0.0] * 8
+
+    source_entropy = _entropy_c(src, &unique_src)
+    destination_entropy = _entropy_c(dst, &unique_dst)
+
+    for i in range(n):
+        if syn[i]:
+            syn_count += 1
+        total_packet_size += size[i]
+
+    return [
+        source_entropy,
+        destination_entropy,
+        syn_count / <double>n,
+        min(1.0, total_packet_size / 1000000) if total_packet_size > 0 else 0.0,
+        min(1.0, n / 500.0),
+        min(1.0, unique_src / 100.0),
+        min(1.0, unique_dst / 50.0),
+        # Entropija skupa različitih protokola je maksimalna čim ih ima više od jednog
+        1.0 if len(set(proto)) > 1 else 0.0,
+    ]
@@ -9,6 +9,11 @@ import os
 import sys
 import json
 import time
+import queue
+import functools
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -17,15 +22,37 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 # Provjeri postoji li flask
 try:
-    from flask import Blueprint, jsonify, request
+    from flask import Blueprint, jsonify, request, current_app, stream_with_context
+    from werkzeug.exceptions import RequestEntityTooLarge
     FLASK_AVAILABLE = True
 except ImportError:
     FLASK_AVAILABLE = False
     print("Warning: Flask is not available. API will not be functional.")
 
+# orjson je opcionalan i koristi se za brže parsiranje tijela zahtjeva
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("Warning: orjson not available, using the standard JSON provider (pip install orjson)")
+
+if FLASK_AVAILABLE and ORJSON_AVAILABLE:
+    from json_provider import ORJSONProvider
+
+# zstandard je opcionalan i koristi se za Content-Encoding: zstd
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    print("Warning: zstandard not available, zstd request and response compression disabled (pip install zstandard)")
+
 # Import iz naših modula
 try:
-    from network.analysis.ddos_detector import DDoSDetector, get_detector
+    from network.analysis.ddos_detector import (
+        DDoSDetector, get_detector, packets_to_columns, NUMPY_AVAILABLE
+    )
 except ImportError as e:
     print(f"Error importing detector module: {e}")
 
@@ -38,68 +65,482 @@ if FLASK_AVAILABLE:
 else:
     analysis_api = None
 
-# Globalni detektor
-detector = get_detector() if 'get_detector' in locals() else None
+# Zaključavanje prve inicijalizacije detektora (istovremeni zahtjevi ne stvaraju više instanci)
+_detector_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_detector_cached():
+    """
+    Vraća instancu detektora; nakon prvog uspješnog poziva rezultat je spremljen.
+    Neuspjela inicijalizacija se ne sprema, pa je sljedeći zahtjev pokušava ponovno.
+    """
+    with _detector_lock:
+        return get_detector()
+
+
+def require_detector(f):
+    """
+    Dekorator za rute koje trebaju detektor: dohvaća ga jednom i predaje kao prvi
+    argument, a ako inicijalizacija ne uspije vraća grešku 500.
+    """
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        try:
+            detector = _get_detector_cached()
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error initializing detector: {str(e)}"
+            }), 500
+        return f(detector, *args, **kwargs)
+    return wrapper
+
+# Najveća veličina tijela zahtjeva (ograničava najgoru potrošnju memorije po zahtjevu)
+MAX_REQUEST_BODY_BYTES = int(os.environ.get("DDOS_MAX_REQUEST_BODY_BYTES", 64 * 1024 * 1024))
+
+# Grupiranje /detect zahtjeva: koliko se najdulje čeka na dodatne zahtjeve nakon prvog
+# i koliko ih se najviše obrađuje zajedno (0 ms isključuje grupiranje)
+DETECT_BATCH_MAX_WAIT_MS = float(os.environ.get("DDOS_DETECT_BATCH_MAX_WAIT_MS", 5))
+DETECT_BATCH_MAX_SIZE = int(os.environ.get("DDOS_DETECT_BATCH_MAX_SIZE", 64))
+
+
+def _request_body():
+    """
+    Parsira JSON tijelo zahtjeva (orjson ako je dostupan).
+    
+    Returns:
+        dict: Tijelo zahtjeva ili prazan rječnik ako tijelo nije poslano
+    """
+    # cache=False: Werkzeug ne zadržava sirove bajtove uz parsirani rezultat
+    if ORJSON_AVAILABLE:
+        raw = request.get_data(cache=False)
+        return orjson.loads(raw) if raw else {}
+    return request.get_json(silent=True, cache=False) or {}
+
+
+def _parse_traffic(json_list):
+    """
+    Pretvara listu paketa iz JSON-a u stupce NumPy polja jednom, na granici API-ja,
+    kako detektor ne bi ponovno prolazio kroz rječnike.
+    
+    Args:
+        json_list: Lista paketa (rječnika)
+        
+    Returns:
+        dict[str, np.ndarray]: Stupci prometa (ili nepromijenjena lista bez NumPy-a)
+        
+    Raises:
+        ValueError: Ako paket nije rječnik ili ima neispravno polje (npr. packet_size: null)
+    """
+    if NUMPY_AVAILABLE:
+        try:
+            columns = packets_to_columns(json_list)
+        except (AttributeError, TypeError, ValueError) as e:
+            raise ValueError(f"Malformed traffic data: {e}") from e
+        # None se u float64 stupcu tiho pretvara u NaN, a NaN se prenosi u zbroj
+        if columns["size"].sum() != columns["size"].sum():
+            raise ValueError("Malformed traffic data: packet_size must be a number")
+        return columns
+    return json_list
+
+
+def _detect_all(detector, traffic_batch):
+    """
+    Detektira napade za listu prozora prometa jednim pozivom detector.detect_batch
+    (ako ga detektor ima), inače redom kroz detector.detect.
+    
+    Args:
+        detector: Instanca detektora
+        traffic_batch: Lista prozora prometa
+        
+    Returns:
+        list: Rezultat detekcije za svaki prozor, istim redom
+    """
+    detect_batch = getattr(detector, "detect_batch", None)
+    if detect_batch is not None and len(traffic_batch) > 1:
+        return detect_batch(traffic_batch)
+    return [detector.detect(traffic_data) for traffic_data in traffic_batch]
+
+
+class _DetectBatcher:
+    """
+    Grupira istovremene /detect zahtjeve i obrađuje ih zajedno u pozadinskoj dretvi.
+    
+    Prvi zahtjev u redu otvara prozor od max_wait_ms milisekundi; svi zahtjevi koji
+    stignu u tom prozoru (najviše max_batch) obrađuju se jednim pozivom
+    detector.detect_batch (ako ga detektor ima), inače redom kroz detector.detect.
+    Svaki zahtjev i dalje dobiva vlastiti rezultat detekcije.
+    """
+    
+    def __init__(self, max_wait_ms=DETECT_BATCH_MAX_WAIT_MS, max_batch=DETECT_BATCH_MAX_SIZE):
+        """
+        Args:
+            max_wait_ms: Najdulje čekanje na dodatne zahtjeve nakon prvog (ms)
+            max_batch: Najveći broj zahtjeva u jednoj grupi
+        """
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+    
+    def submit(self, detector, traffic_data, max_wait_ms=None):
+        """
+        Predaje podatke o prometu na detekciju i čeka rezultat.
+        
+        Args:
+            detector: Instanca detektora
+            traffic_data: Podaci o prometu iz zahtjeva
+            max_wait_ms: 0 za obradu odmah, bez grupiranja (za zahtjeve osjetljive na latenciju)
+            
+        Returns:
+            dict: Rezultat detekcije s preporučenom akcijom
+        """
+        wait = self.max_wait if max_wait_ms is None else float(max_wait_ms) / 1000.0
+        if wait <= 0:
+            return self._run(detector, [traffic_data])[0]
+        
+        self._ensure_worker()
+        slot = {"event": threading.Event()}
+        self._queue.put((detector, traffic_data, slot))
+        slot["event"].wait()
+        
+        if "error" in slot:
+            raise slot["error"]
+        return slot["result"]
+    
+    def _ensure_worker(self):
+        """Pokreće pozadinsku dretvu pri prvom grupiranom zahtjevu."""
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name="detect-batcher", daemon=True)
+                self._worker.start()
+    
+    def _loop(self):
+        """Skuplja zahtjeve do isteka prozora ili punog batch-a i obrađuje ih."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            # Uzastopni zahtjevi prema istom detektoru obrađuju se zajedno
+            start = 0
+            while start < len(batch):
+                end = start + 1
+                while end < len(batch) and batch[end][0] is batch[start][0]:
+                    end += 1
+                self._process(batch[start:end])
+                start = end
+    
+    def _process(self, items):
+        """Obrađuje grupu zahtjeva i budi dretve koje čekaju na rezultat."""
+        try:
+            results = self._run(items[0][0], [traffic_data for _, traffic_data, _ in items])
+            for (_, _, slot), result in zip(items, results):
+                slot["result"] = result
+        except Exception as e:
+            for _, _, slot in items:
+                slot["error"] = e
+        finally:
+            for _, _, slot in items:
+                slot["event"].set()
+    
+    @staticmethod
+    def _run(detector, traffic_batch):
+        """Detektira napade za listu prozora prometa i dodaje preporučene akcije."""
+        results = _detect_all(detector, traffic_batch)
+        
+        for detection_result in results:
+            detection_result["recommended_action"] = detector.recommend_action(detection_result)
+        return results
+
+
+_detect_batcher = _DetectBatcher()
+
+# Pozadinske simulacije napada (generiranje prometa traje sekundama i ne smije
+# blokirati dretvu zahtjeva)
+_sim_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="simulate")
+_sim_jobs = {}
+_sim_jobs_lock = threading.Lock()
+_MAX_SIM_JOBS = 100
+
+# Kratkotrajni cache serijaliziranih odgovora za /status i /attack-history
+# (dashboardi ih prozivaju nekoliko puta u sekundi)
+STATUS_CACHE_TTL = 0.25
+_status_cache = {"entry": None}
+_history_cache = {}
+_HISTORY_CACHE_MAX_ENTRIES = 32
+
+# Streaming povijesti napada kao NDJSON (jedan zapis po retku)
+NDJSON_MIMETYPE = "application/x-ndjson"
+NDJSON_RECORDS_PER_CHUNK = 64
+
+
+def _history_version(detector):
+    """Vraća verziju povijesti napada detektora (ili broj napada ako detektor ne prati verziju)."""
+    version = getattr(detector, "_history_version", None)
+    return len(detector.attack_history) if version is None else version
+
+
+# Vremenska oznaka za /status osvježava se u pozadinskoj dretvi (dovoljna je
+# preciznost od 100 ms), pa se ne formatira pri svakom zahtjevu
+_TIMESTAMP_TICK_SECONDS = 0.1
+_now_iso = None
+_timestamp_thread = None
+_timestamp_lock = threading.Lock()
+
+
+def _timestamp_ticker():
+    """Periodički osvježava _now_iso."""
+    global _now_iso
+    while True:
+        _now_iso = datetime.now().isoformat(timespec="milliseconds")
+        time.sleep(_TIMESTAMP_TICK_SECONDS)
+
+
+def _start_timestamp_ticker():
+    """Pokreće dretvu za vremensku oznaku (jednom po procesu)."""
+    global _timestamp_thread
+    with _timestamp_lock:
+        if _timestamp_thread is None:
+            _timestamp_thread = threading.Thread(target=_timestamp_ticker, name="timestamp-ticker", daemon=True)
+            _timestamp_thread.start()
+
+
+def _current_timestamp():
+    """
+    Vraća trenutno vrijeme u ISO formatu iz pozadinske dretve, a ako ona nije
+    pokrenuta, formatira ga izravno.
+    """
+    return _now_iso or datetime.now().isoformat()
+
+
+# Zadani i najveći broj zapisa koje vraća /attack-history
+DEFAULT_HISTORY_LIMIT = 10
+MAX_HISTORY_LIMIT = 10000
+
+# Parametri simulacije: (ključ, zadana vrijednost, pretvorba)
+_SIM_PARAMS = (
+    ("attack_type", "TCP_SYN_FLOOD", str),
+    ("intensity", "medium", str),
+    ("duration", 30, int),
+)
+
+
+def _parse_limit(raw):
+    """
+    Čita parametar limit izravno iz teksta upita.
+    
+    Args:
+        raw: Vrijednost parametra (ili None)
+        
+    Returns:
+        int: Limit u rasponu [1, MAX_HISTORY_LIMIT]; za neispravnu vrijednost zadani limit
+    """
+    if raw is None or not raw.isdecimal():
+        return DEFAULT_HISTORY_LIMIT
+    return min(MAX_HISTORY_LIMIT, max(1, int(raw)))
+
+
+def _parse_sim_params(body):
+    """
+    Čita i pretvara parametre simulacije u jednom prolazu.
+    
+    Args:
+        body: Tijelo zahtjeva
+        
+    Returns:
+        tuple: (attack_type, intensity, duration)
+        
+    Raises:
+        ValueError, TypeError: Ako se parametar ne može pretvoriti
+    """
+    return tuple(
+        caster(body[key]) if key in body else default
+        for key, default, caster in _SIM_PARAMS
+    )
+
+
+def _ndjson_chunks(records):
+    """
+    Generator NDJSON dijelova odgovora; svaki dio sadrži do NDJSON_RECORDS_PER_CHUNK
+    zapisa (nekoliko KB), pa prvi bajtovi stižu odmah neovisno o veličini povijesti.
+    
+    Args:
+        records: Zapisi za slanje
+        
+    Yields:
+        str: Dio odgovora s jednim JSON zapisom po retku
+    """
+    dumps = current_app.json.dumps
+    for start in range(0, len(records), NDJSON_RECORDS_PER_CHUNK):
+        yield "".join(dumps(record) + "\n" for record in records[start:start + NDJSON_RECORDS_PER_CHUNK])
+
+
+def _cached_json_response(cache, etag, build_payload, ttl=None):
+    """
+    Vraća JSON odgovor iz cache-a ako je ETag nepromijenjen (i TTL nije istekao),
+    inače gradi i serijalizira payload te ga sprema. Ako klijent pošalje isti
+    ETag u If-None-Match, vraća 304 bez tijela (bez gradnje i serijalizacije payloada).
+    
+    ETag je slab (W/) jer se isti sadržaj može poslati i komprimiran (zstd).
+    
+    Args:
+        cache: Rječnik cache-a za rutu; "entry" je nepromjenjiva trojka
+            (etag, ts, body) koja se zamjenjuje jednom dodjelom, pa istovremeni
+            zahtjevi nikad ne vide tijelo jednog ETag-a pod drugim
+        etag: Vrijednost ETag-a trenutnog stanja (bez navodnika)
+        build_payload: Funkcija koja gradi payload (poziva se samo kad je potrebno)
+        ttl: Najdulja starost spremljenog odgovora u sekundama (None - bez ograničenja)
+        
+    Returns:
+        Flask Response
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    
+    now = time.monotonic()
+    entry = cache["entry"]
+    if entry is None or entry[0] != etag or (ttl is not None and now - entry[1] >= ttl):
+        entry = (etag, now, current_app.json.dumps(build_payload()))
+        cache["entry"] = entry
+    
+    response = current_app.response_class(entry[2], mimetype="application/json")
+    response.set_etag(etag, weak=True)
+    return response
+
+# Odgovori manji od ovoga se ne komprimiraju (zaglavlja okvira poništavaju uštedu)
+ZSTD_MIN_RESPONSE_BYTES = 1024
+ZSTD_LEVEL = 3
+
+
+def _decompress_zstd_body():
+    """
+    Dekomprimira tijelo zahtjeva poslano s Content-Encoding: zstd i sprema ga kao
+    podatke zahtjeva, tako da ga _request_body čita kao običan JSON.
+    
+    Returns:
+        Flask Response s greškom ili None ako je dekompresija uspjela
+    """
+    if not ZSTD_AVAILABLE:
+        return jsonify({
+            "status": "error",
+            "message": "zstd content encoding is not supported"
+        }), 415
+    
+    limit = current_app.config.get("MAX_CONTENT_LENGTH") or MAX_REQUEST_BODY_BYTES
+    chunks = []
+    total = 0
+    try:
+        # Čitanje u dijelovima ograničava i veličinu dekomprimiranog tijela
+        reader = zstandard.ZstdDecompressor().stream_reader(request.get_data(cache=False))
+        while True:
+            chunk = reader.read(1 << 20)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > limit:
+                return jsonify({
+                    "status": "error",
+                    "message": "Traffic data too large"
+                }), 413
+            chunks.append(chunk)
+    except zstandard.ZstdError as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid zstd body: {str(e)}"
+        }), 400
+    
+    request._cached_data = b"".join(chunks)
+    return None
+
 
 # API rute
 if FLASK_AVAILABLE:
+    @analysis_api.before_request
+    def decode_request_body():
+        """Dekomprimira zstd tijela zahtjeva"""
+        if request.headers.get("Content-Encoding") == "zstd":
+            return _decompress_zstd_body()
+    
+    @analysis_api.after_request
+    def encode_response_body(response):
+        """Komprimira veće JSON odgovore zstd-om ako ga klijent prihvaća"""
+        if (ZSTD_AVAILABLE and response.status_code == 200 and not response.is_streamed
+                and "Content-Encoding" not in response.headers
+                and "zstd" in request.accept_encodings):
+            response.vary.add("Accept-Encoding")
+            body = response.get_data()
+            if len(body) >= ZSTD_MIN_RESPONSE_BYTES:
+                response.set_data(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body))
+                response.headers["Content-Encoding"] = "zstd"
+        return response
+    
     @analysis_api.route('/status', methods=['GET'])
-    def get_status():
+    @require_detector
+    def get_status(detector):
         """Vraća status detektora"""
-        global detector
+        etag = f"status-{_history_version(detector)}-{int(bool(detector.attack_in_progress))}"
         
-        if detector is None:
-            try:
-                detector = get_detector()
-            except Exception as e:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Error initializing detector: {str(e)}"
-                }), 500
-        
-        return jsonify({
+        return _cached_json_response(_status_cache, etag, lambda: {
             "status": "ready",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _current_timestamp(),
             "attack_history_count": len(detector.attack_history) if detector else 0,
             "attack_in_progress": detector.attack_in_progress if detector else False
-        })
+        }, ttl=STATUS_CACHE_TTL)
     
     @analysis_api.route('/detect', methods=['POST'])
-    def detect_attack():
+    @require_detector
+    def detect_attack(detector):
         """Detektira napad na temelju dostavljenih podataka o prometu"""
-        global detector
-        
-        if detector is None:
-            try:
-                detector = get_detector()
-            except Exception as e:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Error initializing detector: {str(e)}"
-                }), 500
-        
         # Dohvati podatke o prometu iz zahtjeva
         try:
-            traffic_data = request.json.get('traffic_data', [])
+            body = _request_body()
+            traffic_data = body.get('traffic_data', [])
             
             if not traffic_data:
                 return jsonify({
                     "status": "error",
                     "message": "No traffic data provided"
                 }), 400
-                
-            # Detektiraj napad
-            detection_result = detector.detect(traffic_data)
             
-            # Dodaj preporučenu akciju
-            action = detector.recommend_action(detection_result)
-            detection_result["recommended_action"] = action
+            # Nakon pretvorbe u stupce lista paketa i tijelo zahtjeva više nisu potrebni
+            max_wait_ms = body.get('max_wait_ms')
+            try:
+                traffic_data = _parse_traffic(traffic_data)
+            except ValueError as e:
+                return jsonify({
+                    "status": "error",
+                    "message": str(e)
+                }), 400
+            del body
+                
+            # Detektiraj napad (grupirano s istovremenim zahtjevima) i dodaj preporučenu akciju
+            detection_result = _detect_batcher.submit(detector, traffic_data, max_wait_ms)
             
             return jsonify({
                 "status": "success",
                 "detection": detection_result
             })
             
+        except RequestEntityTooLarge:
+            return jsonify({
+                "status": "error",
+                "message": "Traffic data too large"
+            }), 413
         except Exception as e:
             return jsonify({
                 "status": "error",
@@ -107,45 +548,46 @@ if FLASK_AVAILABLE:
             }), 500
     
     @analysis_api.route('/attack-history', methods=['GET'])
-    def get_attack_history():
+    @require_detector
+    def get_attack_history(detector):
         """Vraća povijest detektiranih napada"""
-        global detector
+        # Dohvati limit iz parametara; since (ISO vrijeme) vraća samo novije napade
+        limit = _parse_limit(request.args.get('limit'))
+        since = request.args.get('since')
         
-        if detector is None:
-            try:
-                detector = get_detector()
-            except Exception as e:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Error initializing detector: {str(e)}"
-                }), 500
+        def build_payload():
+            # Dohvati povijest napada
+            attack_history = detector.get_attack_history(limit=limit, since=since)
+            
+            return {
+                "status": "success",
+                "attack_history": attack_history,
+                "count": len(attack_history)
+            }
         
-        # Dohvati limit iz parametara
-        limit = request.args.get('limit', default=10, type=int)
+        # NDJSON: zapisi se šalju u dijelovima (chunked), bez gradnje cijelog tijela odgovora
+        if request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+            records = detector.get_attack_history(limit=limit, since=since)
+            return current_app.response_class(
+                stream_with_context(_ndjson_chunks(records)), mimetype=NDJSON_MIMETYPE
+            )
         
-        # Dohvati povijest napada
-        attack_history = detector.get_attack_history(limit=limit)
+        # Cache po limitu i since; verzija povijesti u ETag-u ga poništava pri svakoj promjeni
+        cache_key = (limit, since)
+        cache = _history_cache.get(cache_key)
+        if cache is None:
+            if len(_history_cache) >= _HISTORY_CACHE_MAX_ENTRIES:
+                _history_cache.clear()
+            cache = _history_cache[cache_key] = {"entry": None}
         
-        return jsonify({
-            "status": "success",
-            "attack_history": attack_history,
-            "count": len(attack_history)
-        })
+        # ETag vrijedi za pojedini URL, pa since (dio URL-a) ne mora biti u njemu
+        etag = f"history-{_history_version(detector)}-{limit}"
+        return _cached_json_response(cache, etag, build_payload)
     
     @analysis_api.route('/reset', methods=['POST'])
-    def reset_detector():
+    @require_detector
+    def reset_detector(detector):
         """Resetira stanje detektora"""
-        global detector
-        
-        if detector is None:
-            try:
-                detector = get_detector()
-            except Exception as e:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Error initializing detector: {str(e)}"
-                }), 500
-        
         # Resetiraj detektor
         detector.reset()
         
@@ -155,19 +597,9 @@ if FLASK_AVAILABLE:
         })
     
     @analysis_api.route('/evaluate', methods=['GET'])
-    def evaluate_detector():
+    @require_detector
+    def evaluate_detector(detector):
         """Evaluira detektor na testnim podacima"""
-        global detector
-        
-        if detector is None:
-            try:
-                detector = get_detector()
-            except Exception as e:
-                return jsonify({
-                    "status": "error",
-                    "message": f"Error initializing detector: {str(e)}"
-                }), 500
-        
         # Evaluiraj na testnim podacima
         evaluation_results = detector.evaluate()
         
@@ -184,55 +616,63 @@ if FLASK_AVAILABLE:
     
     @analysis_api.route('/simulate', methods=['POST'])
     def simulate_attack():
-        """Simulira napad za testiranje detektora"""
+        """
+        Pokreće simulaciju napada za testiranje detektora kao pozadinski posao.
+        Odmah vraća 202 s job_id; rezultat se dohvaća preko GET /simulate/<job_id>.
+        """
         try:
-            from datasets.generator import DatasetGenerator
-            
             # Dohvati parametre iz zahtjeva
-            params = request.json or {}
-            attack_type = params.get('attack_type', 'TCP_SYN_FLOOD')
-            intensity = params.get('intensity', 'medium')
-            duration = params.get('duration', 30)
-            
-            # Inicijaliziraj generator
-            generator = DatasetGenerator()
-            
-            # Generiraj promet za napad
-            attack_traffic = generator.generate_attack_traffic(
-                attack_type=attack_type,
-                intensity=intensity,
-                duration_seconds=duration
-            )
+            try:
+                attack_type, intensity, duration = _parse_sim_params(_request_body())
+            except (TypeError, ValueError) as e:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Invalid simulation parameters: {str(e)}"
+                }), 400
             
-            # Generiraj mali uzorak normalnog prometa za usporedbu
-            normal_traffic = generator.generate_normal_traffic(duration_seconds=10)
+            # Simulacija radi i bez detektora (tada vraća samo generirani promet)
+            try:
+                sim_detector = _get_detector_cached()
+            except Exception:
+                sim_detector = None
             
-            # Detektiraj napad na generiranom prometu ako je detektor dostupan
-            detection_results = None
-            if detector:
-                # Za normalni promet
-                normal_detection = detector.detect(normal_traffic[:100])  # Prvih 100 paketa
-                
-                # Za napadački promet
-                attack_detection = detector.detect(attack_traffic[:100])  # Prvih 100 paketa
-                
-                detection_results = {
-                    "normal": normal_detection,
-                    "attack": attack_detection
-                }
+            job_id = _submit_simulation(sim_detector, attack_type, intensity, duration)
+            if job_id is None:
+                return jsonify({
+                    "status": "error",
+                    "message": "Too many pending simulations, try again later"
+                }), 503
             
             return jsonify({
-                "status": "success",
-                "simulation": {
-                    "attack_type": attack_type,
-                    "intensity": intensity,
-                    "duration": duration,
-                    "normal_traffic_size": len(normal_traffic),
-                    "attack_traffic_size": len(attack_traffic)
-                },
-                "detection_results": detection_results
-            })
+                "status": "accepted",
+                "job_id": job_id
+            }), 202
             
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error simulating attack: {str(e)}"
+            }), 500
+    
+    @analysis_api.route('/simulate/<job_id>', methods=['GET'])
+    def get_simulation_result(job_id):
+        """Vraća status ili rezultat pozadinske simulacije napada"""
+        with _sim_jobs_lock:
+            future = _sim_jobs.get(job_id)
+        if future is None:
+            return jsonify({
+                "status": "error",
+                "message": "Unknown simulation job"
+            }), 404
+        
+        if not future.done():
+            return jsonify({
+                "status": "pending",
+                "job_id": job_id
+            }), 202
+        
+        try:
+            return jsonify(future.result())
         except ImportError:
             return jsonify({
                 "status": "error",
@@ -245,6 +685,112 @@ if FLASK_AVAILABLE:
             }), 500
 
 
+# Broj paketa generiranog prometa koji se propušta kroz detektor u simulaciji
+SIM_DETECT_SAMPLE = 100
+
+
+@functools.lru_cache(maxsize=1)
+def _get_generator():
+    """
+    Vraća jednu zajedničku instancu generatora prometa.
+    """
+    from datasets.generator import DatasetGenerator
+    return DatasetGenerator()
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_attack_traffic(attack_type, intensity, duration):
+    """
+    Generira promet napada jednom po (attack_type, intensity, duration).
+    
+    Sprema se samo ono što simulacija koristi - ukupan broj paketa i uzorak
+    za detekciju u obliku stupaca - a ne cijela lista paketa.
+    
+    Returns:
+        tuple: (broj paketa, stupci uzorka)
+    """
+    attack_traffic = _get_generator().generate_attack_traffic(
+        attack_type=attack_type,
+        intensity=intensity,
+        duration_seconds=duration
+    )
+    return len(attack_traffic), _parse_traffic(attack_traffic[:SIM_DETECT_SAMPLE])
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_normal_traffic():
+    """
+    Generira mali uzorak normalnog prometa za usporedbu (jednom).
+    
+    Returns:
+        tuple: (broj paketa, stupci uzorka)
+    """
+    normal_traffic = _get_generator().generate_normal_traffic(duration_seconds=10)
+    return len(normal_traffic), _parse_traffic(normal_traffic[:SIM_DETECT_SAMPLE])
+
+
+def _run_simulation(detector, attack_type, intensity, duration):
+    """
+    Generira (ili iz cache-a dohvaća) napadački i normalni promet te ga propušta
+    kroz detektor.
+    
+    Args:
+        detector: Instanca detektora (ili None)
+        attack_type: Tip napada
+        intensity: Intenzitet napada
+        duration: Trajanje napada u sekundama
+        
+    Returns:
+        dict: Rezultat simulacije
+    """
+    attack_traffic_size, attack_sample = _cached_attack_traffic(attack_type, intensity, duration)
+    normal_traffic_size, normal_sample = _cached_normal_traffic()
+    
+    # Detektiraj napad na generiranom prometu ako je detektor dostupan
+    detection_results = None
+    if detector:
+        # Normalni i napadački uzorak obrađuju se zajedno (jedan poziv modela ako detektor
+        # podržava detect_batch); svaki uzorak je zaseban prozor s vlastitim rezultatom
+        normal_detection, attack_detection = _detect_all(detector, [normal_sample, attack_sample])
+        
+        detection_results = {
+            "normal": normal_detection,
+            "attack": attack_detection
+        }
+    
+    return {
+        "status": "success",
+        "simulation": {
+            "attack_type": attack_type,
+            "intensity": intensity,
+            "duration": duration,
+            "normal_traffic_size": normal_traffic_size,
+            "attack_traffic_size": attack_traffic_size
+        },
+        "detection_results": detection_results
+    }
+
+
+def _submit_simulation(detector, attack_type, intensity, duration):
+    """
+    Predaje simulaciju u pozadinski bazen dretvi.
+    
+    Returns:
+        str: ID posla, ili None ako je dosegnut najveći broj poslova na čekanju
+    """
+    with _sim_jobs_lock:
+        # Zadrži ograničen broj poslova; najprije se brišu najstariji završeni
+        if len(_sim_jobs) >= _MAX_SIM_JOBS:
+            for old_id in [jid for jid, fut in _sim_jobs.items() if fut.done()][:len(_sim_jobs) - _MAX_SIM_JOBS + 1]:
+                del _sim_jobs[old_id]
+            if len(_sim_jobs) >= _MAX_SIM_JOBS:
+                return None
+        
+        job_id = uuid.uuid4().hex
+        _sim_jobs[job_id] = _sim_executor.submit(_run_simulation, detector, attack_type, intensity, duration)
+    return job_id
+
+
 # Inicijalizacijska funkcija koja se poziva iz glavnog Flask aplikacije
 def init_analysis_api(app):
     """
@@ -256,23 +802,60 @@ def init_analysis_api(app):
     if FLASK_AVAILABLE and analysis_api:
         app.register_blueprint(analysis_api, url_prefix='/api/analysis')
         
+        _start_timestamp_ticker()
+        
+        if app.config.get("MAX_CONTENT_LENGTH") is None:
+            app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BODY_BYTES
+        
+        # Brža serijalizacija odgovora (i NumPy vrijednosti) preko orjson-a
+        if ORJSON_AVAILABLE:
+            app.json = ORJSONProvider(app)
+        
         # Inicijaliziraj detektor
-        global detector
         try:
-            detector = get_detector()
+            detector = _get_detector_cached()
             print("DDoS detector initialized successfully")
+            
+            # Zagrij detektor (Numba jezgre, graf modela) prije prvog zahtjeva
+            elapsed = detector.warm_up()
+            print(f"DDoS detector warmed up in {elapsed * 1000:.1f} ms")
         except Exception as e:
             print(f"Error initializing DDoS detector: {e}")
     else:
         print("Flask is not available, analysis API not registered")
     
 
-# Ako se skripta izvršava direktno, pokreni testni server
-if __name__ == "__main__":
+def create_app():
+    """
+    Tvornica Flask aplikacije s registriranim API-jem za detekciju.
+    
+    Omogućuje pokretanje pod produkcijskim WSGI serverom s više radnih procesa, npr.
+    gunicorn -k gthread -w 4 "network.analysis.api:create_app()"
+    (bez --preload, kako bi svaki radni proces imao vlastitu instancu detektora).
+    
+    Returns:
+        Flask aplikacija
+    """
     from flask import Flask
     
     app = Flask(__name__)
     init_analysis_api(app)
+    return app
+
+
+# Ako se skripta izvršava direktno, pokreni server
+if __name__ == "__main__":
+    app = create_app()
+    host = os.environ.get("DDOS_API_HOST", "127.0.0.1")
+    port = int(os.environ.get("DDOS_API_PORT", 5555))
     
-    print("Starting test server for analysis API...")
-    app.run(debug=True, port=5555)
\ No newline at end of file
+    try:
+        # Produkcijski WSGI server s više dretvi, ako je dostupan
+        from waitress import serve
+        threads = max(8, (os.cpu_count() or 1) * 2)
+        print(f"Starting analysis API on waitress ({threads} threads)...")
+        serve(app, host=host, port=port, threads=threads)
+    except ImportError:
+        print("Warning: waitress not available, using the Flask development server (pip install waitress)")
+        print("Starting test server for analysis API...")
+        app.run(debug=True, host=host, port=port)
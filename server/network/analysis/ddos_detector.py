@@ -10,6 +10,13 @@ import os
 import sys
 import json
 import time
+import math
+import queue
+import bisect
+import threading
+from concurrent.futures import Future
+from collections import Counter, deque
+from itertools import islice
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -24,6 +31,14 @@ except ImportError:
     NUMPY_AVAILABLE = False
     print("Warning: NumPy not available, using basic Python lists instead")
 
+# Numba je opcionalan i koristi se za kompilirani izračun značajki (bez GIL-a)
+NUMBA_AVAILABLE = False
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    pass
+
 # Import iz naših modula
 try:
     from ml.ddqn.dataset_loader import DDQNDataLoader
@@ -37,30 +52,293 @@ MODEL_DIR.mkdir(exist_ok=True)
 DEFAULT_MODEL_PATH = MODEL_DIR / "ddqn_best_model.h5"
 SIMPLIFIED_MODEL_PATH = MODEL_DIR / "ddqn_best_model_simplified.json"
 
+# Tablica vrijednosti c·log2(c) za male frekvencije, kako entropija ne bi
+# računala logaritam za svaku vrijednost (veće frekvencije koriste math.log2)
+_XLOG2X_TABLE_SIZE = 4096
+_XLOG2X = [0.0] + [c * math.log2(c) for c in range(1, _XLOG2X_TABLE_SIZE)]
+
+# Najveći broj prozora prometa (poziva detect) koji se čuvaju u povijesti
+MAX_TRAFFIC_HISTORY = 1000
+
+# Najveći broj zapisa u povijesti napada (stariji zapisi se odbacuju)
+MAX_ATTACK_HISTORY = 10000
+
+# Kapacitet redova cjevovoda detekcije i najveći broj zahtjeva koje dretva
+# za inferenciju spaja u jedan poziv modela
+PIPELINE_QUEUE_SIZE = 32
+PIPELINE_MAX_BATCH = 32
+
+# Jeftini filtar prije modela: prozor s manje paketa, bajtova i izvorišnih
+# adresa od ovih pragova (sva tri uvjeta) smatra se benignim bez inferencije
+GATE_MAX_PACKETS = 50
+GATE_MAX_BYTES = 50000
+GATE_MAX_SOURCES = 10
+
+def packets_to_columns(traffic_data):
+    """
+    Pretvara listu paketa (rječnika) u stupce NumPy polja. IP adrese i protokoli
+    kodiraju se u guste cjelobrojne ID-jeve (0..k-1) unutar prozora, što je
+    dovoljno za entropiju i broj jedinstvenih vrijednosti.
+    
+    Args:
+        traffic_data: Lista paketa
+        
+    Returns:
+        dict: Stupci src, dst, proto (int32 ID-jevi), syn (bool) i size (float64)
+    """
+    n = len(traffic_data)
+    src_ids = {}
+    dst_ids = {}
+    proto_ids = {}
+    return {
+        "src": np.fromiter((src_ids.setdefault(p.get("src_ip", "unknown"), len(src_ids)) for p in traffic_data), dtype=np.int32, count=n),
+        "dst": np.fromiter((dst_ids.setdefault(p.get("dst_ip", "unknown"), len(dst_ids)) for p in traffic_data), dtype=np.int32, count=n),
+        "proto": np.fromiter((proto_ids.setdefault(p.get("protocol", "unknown"), len(proto_ids)) for p in traffic_data), dtype=np.int32, count=n),
+        "syn": np.fromiter((p.get("tcp_flags") == "S" for p in traffic_data), dtype=np.bool_, count=n),
+        "size": np.fromiter((p.get("packet_size", 0) for p in traffic_data), dtype=np.float64, count=n),
+    }
+
+
+def packets_to_lists(traffic_data):
+    """
+    Pretvara listu paketa (rječnika) u stupce običnih Python lista; koristi se
+    kad NumPy nije dostupan.
+    
+    Args:
+        traffic_data: Lista paketa
+        
+    Returns:
+        dict: Stupci src, dst, proto, syn (bool) i size
+    """
+    return {
+        "src": [p.get("src_ip", "unknown") for p in traffic_data],
+        "dst": [p.get("dst_ip", "unknown") for p in traffic_data],
+        "proto": [p.get("protocol", "unknown") for p in traffic_data],
+        "syn": [p.get("tcp_flags") == "S" for p in traffic_data],
+        "size": [p.get("packet_size", 0) for p in traffic_data],
+    }
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True, nogil=True, fastmath=True)
+    def _entropy_counts_nb(counts):
+        """
+        Normalizirana Shannon entropija i broj različitih vrijednosti iz polja
+        frekvencija (nule se preskaču).
+        """
+        n = 0
+        k = 0
+        acc = 0.0
+        for c in counts:
+            if c > 0:
+                n += c
+                k += 1
+                acc += c * np.log(c)
+        
+        if k <= 1:
+            return 0.0, k
+        return (np.log(n) - acc / n) / np.log(k), k
+
+    @numba.njit(cache=True, nogil=True, fastmath=True)
+    def _entropy_of_ids(ids):
+        """
+        Normalizirana Shannon entropija i broj različitih vrijednosti za guste ID-jeve.
+        """
+        counts = np.zeros(ids.max() + 1, dtype=np.int64)
+        for i in range(ids.shape[0]):
+            counts[ids[i]] += 1
+        return _entropy_counts_nb(counts)
+
+    @numba.njit(cache=True, nogil=True, fastmath=True)
+    def _extract_features(src, dst, proto, syn, size):
+        """
+        Kompilirani izračun vektora od 8 značajki iz stupaca paketa.
+        Ne drži GIL, pa se istovremeni zahtjevi mogu izvoditi paralelno.
+        """
+        features = np.zeros(8)
+        n = src.shape[0]
+        if n == 0:
+            return features
+        
+        source_entropy, unique_src = _entropy_of_ids(src)
+        destination_entropy, unique_dst = _entropy_of_ids(dst)
+        _, unique_proto = _entropy_of_ids(proto)
+        
+        syn_count = 0
+        total_packet_size = 0.0
+        for i in range(n):
+            if syn[i]:
+                syn_count += 1
+            total_packet_size += size[i]
+        
+        features[0] = source_entropy
+        features[1] = destination_entropy
+        features[2] = syn_count / n
+        features[3] = min(1.0, total_packet_size / 1000000)
+        features[4] = min(1.0, n / 500.0)
+        features[5] = min(1.0, unique_src / 100.0)
+        features[6] = min(1.0, unique_dst / 50.0)
+        # Entropija skupa različitih protokola je maksimalna čim ih ima više od jednog
+        features[7] = 1.0 if unique_proto > 1 else 0.0
+        return features
+elif NUMPY_AVAILABLE:
+    def _entropy_from_counts(counts):
+        """
+        Vektorizirana normalizirana Shannon entropija iz pozitivnih frekvencija.
+        
+        Koristi H = log(n) - Σ c·log(c) / n, normalizirano s log(k); baza
+        logaritma se pri normalizaciji krati, pa je rezultat isti kao s log2.
+        
+        Args:
+            counts: NumPy polje frekvencija (sve > 0)
+            
+        Returns:
+            float: Normalizirana entropija [0, 1]
+        """
+        k = len(counts)
+        if k <= 1:
+            return 0.0
+        n = counts.sum()
+        return float((np.log(n) - np.dot(counts, np.log(counts)) / n) / np.log(k))
+
+    def _entropy_of_ids(ids):
+        """
+        Normalizirana Shannon entropija i broj različitih vrijednosti (NumPy inačica).
+        """
+        counts = np.bincount(ids)
+        counts = counts[counts > 0]
+        return _entropy_from_counts(counts), len(counts)
+
+    def _extract_features(src, dst, proto, syn, size):
+        """
+        Vektorizirani izračun vektora od 8 značajki iz stupaca paketa.
+        """
+        features = np.zeros(8)
+        n = src.shape[0]
+        if n == 0:
+            return features
+        
+        features[0], unique_src = _entropy_of_ids(src)
+        features[1], unique_dst = _entropy_of_ids(dst)
+        _, unique_proto = _entropy_of_ids(proto)
+        features[2] = np.count_nonzero(syn) / n
+        features[3] = min(1.0, size.sum() / 1000000)
+        features[4] = min(1.0, n / 500.0)
+        features[5] = min(1.0, unique_src / 100.0)
+        features[6] = min(1.0, unique_dst / 50.0)
+        features[7] = 1.0 if unique_proto > 1 else 0.0
+        return features
+
+
+# Cython jezgra za značajke bez NumPy-a (učitava se lijeno, samo ako je Cython dostupan)
+_FEATURE_EXTENSION = None
+_FEATURE_EXTENSION_LOADED = False
+
+def _get_feature_extension():
+    """
+    Kompilira (pri prvom pozivu) i vraća Cython modul za izračun značajki.
+    
+    Returns:
+        Modul s funkcijama extract_features i entropy ili None ako Cython nije dostupan
+    """
+    global _FEATURE_EXTENSION, _FEATURE_EXTENSION_LOADED
+    
+    if not _FEATURE_EXTENSION_LOADED:
+        _FEATURE_EXTENSION_LOADED = True
+        try:
+            import pyximport
+            importers = pyximport.install(language_level=3)
+            try:
+                from network.analysis import _ddos_features
+                _FEATURE_EXTENSION = _ddos_features
+            finally:
+                pyximport.uninstall(*importers)
+        except Exception as e:
+            print(f"Cython jezgra za značajke nije dostupna, koristi se Python: {e}")
+    
+    return _FEATURE_EXTENSION
+
+
+# Mali uzorak prometa (2 paketa) za zagrijavanje detektora pri pokretanju
+_WARM_UP_TRAFFIC = [
+    {"src_ip": "10.0.0.1", "dst_ip": "10.0.0.2", "protocol": "TCP", "tcp_flags": "S", "packet_size": 60},
+    {"src_ip": "10.0.0.3", "dst_ip": "10.0.0.2", "protocol": "UDP", "tcp_flags": "", "packet_size": 512},
+]
+
+
 class DDoSDetector:
     """
     Detektor DDoS napada koji koristi DDQN model za analizu mrežnog prometa
     i detekciju potencijalnih napada u stvarnom vremenu.
     """
     
-    def __init__(self, model_path=None, window_size=5):
+    # Težine značajki za procjenu težine napada; (1 - destination_entropy) * 0.05
+    # je rastavljen na težinu -0.05 i pomak 0.05
+    _SEV_WEIGHTS = np.array([0.1, -0.05, 0.15, 0.4, 0.3, 0.0, 0.0, 0.0]) if NUMPY_AVAILABLE else None
+    _SEV_BIAS = 0.05
+    
+    # Pravila za procjenu tipa napada (redoslijed je prioritet; prvo zadovoljeno pravilo pobjeđuje).
+    # Predznak +1 znači "značajka > prag", -1 "značajka < prag", 0 da se značajka ne provjerava.
+    # Redoslijed značajki: source_entropy, destination_entropy, syn_ratio, traffic_volume,
+    # packet_rate, unique_src_count, unique_dst_count, protocol_imbalance
+    _RULE_NAMES = ["TCP SYN Flood", "UDP Flood", "ICMP Flood", "Distributed Flood", "HTTP Flood", "Slowloris"]
+    if NUMPY_AVAILABLE:
+        _RULE_THRESHOLDS = np.array([
+            [0.0, 0.0, 0.6, 0.0, 0.0, 0.0, 0.0, 0.0],
+            [0.0, 0.0, 0.0, 0.0, 0.7, 0.0, 0.0, 0.3],
+            [0.0, 0.2, 0.0, 0.0, 0.6, 0.0, 0.0, 0.0],
+            [0.0, 0.0, 0.0, 0.7, 0.0, 0.6, 0.0, 0.0],
+            [0.0, 0.0, 0.3, 0.5, 0.0, 0.0, 0.0, 0.0],
+            [0.0, 0.0, 0.0, 0.4, 0.4, 0.0, 0.0, 0.0],
+        ])
+        _RULE_SIGNS = np.array([
+            [0, 0, 1, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 1, 0, 0, -1],
+            [0, -1, 0, 0, 1, 0, 0, 0],
+            [0, 0, 0, 1, 0, 1, 0, 0],
+            [0, 0, -1, 1, 0, 0, 0, 0],
+            [0, 0, 0, -1, -1, 0, 0, 0],
+        ], dtype=np.int8)
+    
+    def __init__(self, model_path=None, window_size=5, cheap_gate=True):
         """
         Inicijalizacija detektora.
         
         Args:
             model_path: Putanja do modela. Ako nije navedena, koristi se zadani model.
             window_size: Veličina vremenskog prozora za analizu
+            cheap_gate: Preskače li se model za očito benigne prozore (vidi GATE_MAX_*)
         """
         self.window_size = window_size
+        self.cheap_gate = cheap_gate
         self.model_path = model_path
         self.ddqn_agent = None
-        self.traffic_history = []
-        self.attack_history = []
+        self.traffic_history = deque(maxlen=MAX_TRAFFIC_HISTORY)
+        self.attack_history = deque(maxlen=MAX_ATTACK_HISTORY)
+        
+        # Vektori značajki posljednjih window_size prozora prometa
+        self._window_features = deque(maxlen=window_size)
+        
+        # Ponovno korišteni float32 međuspremnik stanja za model (window_size x 8 značajki)
+        self._state_buf = np.zeros(window_size * 8, dtype=np.float32) if NUMPY_AVAILABLE else None
         self.last_attack_time = None
+        self._last_attack_epoch = 0.0
+        self._last_attack_iso = None
         self.last_attack_type = None
         self.attack_in_progress = False
         self.current_attack_severity = 0.0
         
+        # Verzija povijesti napada; povećava se pri svakoj promjeni povijesti kako bi
+        # API mogao u O(1) provjeriti je li spremljeni odgovor još valjan
+        self._history_version = 0
+        
+        # Cjevovod detekcije: predobrada i inferencija rade u zasebnim dretvama
+        # povezanima redovima; dretve se pokreću pri prvoj detekciji
+        self._pre_q = queue.Queue(PIPELINE_QUEUE_SIZE)
+        self._post_q = queue.Queue(PIPELINE_QUEUE_SIZE)
+        self._pipeline_lock = threading.Lock()
+        self._pipeline_started = False
+        
         # Inicijaliziraj dataset loader
         self.dataset_loader = DDQNDataLoader()
         
@@ -111,38 +389,39 @@ class DDoSDetector:
         
         # Izvlačenje potrebnih značajki
         try:
-            # Osnovne značajke
-            source_ips = [packet.get("src_ip", "unknown") for packet in traffic_data]
-            destination_ips = [packet.get("dst_ip", "unknown") for packet in traffic_data]
+            if NUMPY_AVAILABLE:
+                # Stupci paketa (ako ih API već nije pripremio) i izračun svih značajki odjednom
+                columns = traffic_data if isinstance(traffic_data, dict) else packets_to_columns(traffic_data)
+                return _extract_features(
+                    columns["src"], columns["dst"], columns["proto"], columns["syn"], columns["size"]
+                ).tolist()
             
-            unique_src_ips = set(source_ips)
-            unique_dst_ips = set(destination_ips)
+            # Stupci paketa kao Python liste (ako ih detect već nije pripremio)
+            columns = traffic_data if isinstance(traffic_data, dict) else packets_to_lists(traffic_data)
             
-            # Računanje značajki
-            protocol_counts = {}
-            syn_count = 0
-            total_packet_size = 0
+            # Kompilirana petlja po paketima, ako je Cython jezgra izgrađena
+            extension = _get_feature_extension()
+            if extension is not None:
+                return extension.extract_features(
+                    columns["src"], columns["dst"], columns["proto"], columns["syn"], columns["size"]
+                )
             
-            for packet in traffic_data:
-                protocol = packet.get("protocol", "unknown")
-                protocol_counts[protocol] = protocol_counts.get(protocol, 0) + 1
-                
-                # SYN paketi
-                if packet.get("tcp_flags") == "S":
-                    syn_count += 1
-                
-                # Veličina paketa
-                packet_size = packet.get("packet_size", 0)
-                total_packet_size += packet_size
+            # Osnovne značajke
+            source_ips = columns["src"]
+            destination_ips = columns["dst"]
             
-            # Normalizacija značajki
-            total_packets = len(traffic_data)
+            # Računanje značajki
+            protocols = set(columns["proto"])
+            syn_count = sum(columns["syn"])
+            total_packet_size = sum(columns["size"])
             
-            # Shannon entropija izvorišnih IP adresa
-            source_entropy = self._calculate_entropy(source_ips)
+            # Normalizacija značajki
+            total_packets = len(source_ips)
             
-            # Shannon entropija odredišnih IP adresa
-            destination_entropy = self._calculate_entropy(destination_ips)
+            # Shannon entropija izvorišnih i odredišnih IP adresa; broj jedinstvenih
+            # adresa čita se iz iste tablice frekvencija, bez zasebnog set()
+            source_entropy, unique_src = self._entropy_and_count(source_ips)
+            destination_entropy, unique_dst = self._entropy_and_count(destination_ips)
             
             # Omjer SYN paketa
             syn_ratio = syn_count / total_packets if total_packets > 0 else 0
@@ -155,11 +434,11 @@ class DDoSDetector:
             packet_rate = min(1.0, total_packets / (500 * time_span)) if time_span > 0 else 0
             
             # Broj jedinstvenih izvorišnih i odredišnih IP adresa
-            unique_src_count = min(1.0, len(unique_src_ips) / 100) if unique_src_ips else 0
-            unique_dst_count = min(1.0, len(unique_dst_ips) / 50) if unique_dst_ips else 0
+            unique_src_count = min(1.0, unique_src / 100) if unique_src else 0
+            unique_dst_count = min(1.0, unique_dst / 50) if unique_dst else 0
             
             # Mjera neravnoteže u distribuciji protokola
-            protocol_imbalance = self._calculate_entropy(list(protocol_counts.keys()))
+            protocol_imbalance = self._calculate_entropy(list(protocols))
             
             # Stvaranje vektora značajki
             features = [
@@ -191,148 +470,444 @@ class DDoSDetector:
         """
         if not values:
             return 0.0
+        
+        extension = _get_feature_extension()
+        if extension is not None:
+            return extension.entropy(list(values))
+        
+        return self._entropy_and_count(values)[0]
+    
+    def _entropy_and_count(self, values):
+        """
+        Izračunava Shannon entropiju i broj različitih vrijednosti iz jedne
+        tablice frekvencija.
+        
+        Args:
+            values: Lista vrijednosti
             
-        # Računamo frekvencije
-        freq_dict = {}
-        for val in values:
-            freq_dict[val] = freq_dict.get(val, 0) + 1
-            
-        # Izračun entropije
-        entropy = 0.0
+        Returns:
+            tuple: (normalizirana Shannon entropija [0, 1], broj različitih vrijednosti)
+        """
+        # Frekvencije vrijednosti
+        counts = Counter(values)
+        k = len(counts)
+        if k <= 1:
+            return 0.0, k
+        
+        # H = log2(n) - Σ c·log2(c) / n, normalizirano s log2(k)
         n = len(values)
-        for count in freq_dict.values():
-            p = count / n
-            if p > 0:
-                entropy -= p * (math.log2(p) if 'math' in sys.modules else math_log2_fallback(p))
-            
-        # Normalizacija na raspon [0, 1]
-        max_entropy = (math.log2(len(freq_dict)) if 'math' in sys.modules else math_log2_fallback(len(freq_dict))) if freq_dict else 0
-        if max_entropy > 0:
-            return entropy / max_entropy
-        return 0.0
+        sum_xlogx = sum(
+            _XLOG2X[c] if c < _XLOG2X_TABLE_SIZE else c * math.log2(c)
+            for c in counts.values()
+        )
+        return (math.log2(n) - sum_xlogx / n) / math.log2(k), k
     
-    def detect(self, traffic_data):
+    def _prepare_window(self, traffic_data):
         """
-        Detektira potencijalne DDoS napade u mrežnom prometu.
+        Pretvara prozor prometa u stupce i računa njegove značajke. Ne mijenja
+        stanje detektora pa se izvršava u dretvi za predobradu.
         
         Args:
             traffic_data: Podaci o trenutnom mrežnom prometu
             
         Returns:
-            dict: Rezultati detekcije
+            tuple: (stupci prometa, vektor značajki prozora)
         """
-        # Dodaj trenutne podatke u povijest
-        self.traffic_history.append(traffic_data)
+        # Lista paketa se jednom pretvara u stupce (NumPy polja ili Python liste);
+        # povijest čuva stupce umjesto rječnika po paketu
+        if not isinstance(traffic_data, dict):
+            traffic_data = packets_to_columns(traffic_data) if NUMPY_AVAILABLE else packets_to_lists(traffic_data)
         
-        # Ograniči povijest na zadnjih N paketa
-        max_history = 1000
-        if len(self.traffic_history) > max_history:
-            self.traffic_history = self.traffic_history[-max_history:]
+        return traffic_data, self.preprocess_traffic_data(traffic_data)
+    
+    def _push_window(self, traffic_data, window_features):
+        """
+        Dodaje pripremljeni prozor u povijest i vraća stanje za model.
         
-        # Predobradi podatke za posljednjih X paketa
-        current_window = self.traffic_history[-self.window_size:] if len(self.traffic_history) >= self.window_size else self.traffic_history
+        Args:
+            traffic_data: Stupci trenutnog prometa
+            window_features: Vektor značajki trenutnog prozora
+            
+        Returns:
+            tuple: (značajke zadnjih window_size prozora, stanje za model). Uz NumPy
+            stanje je dijeljeni međuspremnik koji sljedeći poziv prepisuje.
+        """
+        # Dodaj trenutne podatke u povijest (prstenasti spremnik zadnjih MAX_TRAFFIC_HISTORY prozora)
+        self.traffic_history.append(traffic_data)
         
-        # Za svaki prozor računamo značajke
-        features = []
-        for i in range(min(self.window_size, len(current_window))):
-            window_data = current_window[i]
-            window_features = self.preprocess_traffic_data(window_data)
-            features.append(window_features)
+        # Značajke prethodnih prozora ne mijenjaju se pa se čuvaju za
+        # posljednjih window_size poziva
+        self._window_features.append(window_features)
+        features = list(self._window_features)
         
         # Dopuni značajke ako nemamo dovoljno povijesti
         while len(features) < self.window_size:
             features.insert(0, features[0] if features else [0.0] * 8)
         
-        # Pretvori značajke u format za model
+        # Pretvori značajke u format za model; stanje se upisuje u isti float32
+        # međuspremnik pa nema alokacije ni pretvorbe iz float64 po pozivu
         if NUMPY_AVAILABLE:
-            state = np.array(features).flatten()
+            state = self._state_buf
+            for i, window_features in enumerate(features):
+                state[i * 8:(i + 1) * 8] = window_features
         else:
             # Flatten lista bez NumPy
             state = [item for sublist in features for item in sublist]
         
-        # Detekcija napada pomoću DDQN modela
-        if self.ddqn_agent:
-            action, q_values = self.ddqn_agent.predict(state)
+        return features, state
+    
+    def _model_unavailable_result(self):
+        """
+        Rezultat detekcije kad model nije dostupan.
+        """
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "is_attack": False,
+            "confidence": 0.0,
+            "message": "Model nije dostupan za detekciju"
+        }
+    
+    def detect(self, traffic_data):
+        """
+        Detektira potencijalne DDoS napade u mrežnom prometu.
+        
+        Args:
+            traffic_data: Podaci o trenutnom mrežnom prometu (lista paketa ili
+                stupci iz packets_to_columns)
+            
+        Returns:
+            dict: Rezultati detekcije
+        """
+        return self.detect_async(traffic_data).result()
+    
+    def detect_async(self, traffic_data):
+        """
+        Predaje prozor prometa cjevovodu za detekciju bez čekanja rezultata.
+        
+        Args:
+            traffic_data: Podaci o trenutnom mrežnom prometu
+            
+        Returns:
+            Future: Budući rezultat detekcije (dict kao kod detect)
+        """
+        return self._submit([traffic_data], single=True)
+    
+    def detect_batch(self, traffic_data_batch):
+        """
+        Detektira napade za više prozora prometa jednim pozivom modela.
+        
+        Prozori se obrađuju redom kao uzastopni pozivi detect (svaki vidi
+        povijest prethodnih), ali se stanja skupljaju u jednu matricu
+        (B x window_size*8) i model se poziva samo jednom.
+        
+        Args:
+            traffic_data_batch: Lista podataka o prometu
+            
+        Returns:
+            list: Rezultat detekcije za svaki prozor, istim redom
+        """
+        if not traffic_data_batch:
+            return []
+        return self._submit(list(traffic_data_batch)).result()
+    
+    def _submit(self, traffic_data_batch, single=False):
+        """
+        Stavlja prozore u red za predobradu i vraća Future s rezultatima.
+        
+        Args:
+            traffic_data_batch: Lista podataka o prometu
+            single: Vraća li Future jedan rezultat umjesto liste
+            
+        Returns:
+            Future: Budući rezultat (ili lista rezultata)
+        """
+        self._ensure_pipeline()
+        future = Future()
+        self._pre_q.put((traffic_data_batch, future, single))
+        return future
+    
+    def _run_on_pipeline(self, fn):
+        """
+        Izvršava fn u dretvi za inferenciju, redom predaje u odnosu na prozore,
+        pa promjena stanja detektora nikad ne zatekne detekciju u tijeku.
+        
+        Args:
+            fn: Funkcija bez argumenata
+            
+        Returns:
+            Rezultat funkcije fn
+        """
+        self._ensure_pipeline()
+        future = Future()
+        # Kontrolna stavka: umjesto prozora nosi None, a umjesto zastavice funkciju
+        self._pre_q.put((None, future, fn))
+        return future.result()
+    
+    def _ensure_pipeline(self):
+        """
+        Pri prvoj detekciji pokreće dretve za predobradu i inferenciju.
+        """
+        if self._pipeline_started:
+            return
+        with self._pipeline_lock:
+            if self._pipeline_started:
+                return
+            threading.Thread(target=self._preprocess_loop, name="ddos-preprocess", daemon=True).start()
+            threading.Thread(target=self._infer_loop, name="ddos-inference", daemon=True).start()
+            self._pipeline_started = True
+    
+    def _preprocess_loop(self):
+        """
+        Dretva za predobradu: pretvara prozore u stupce i računa značajke.
+        Numba jezgre ne drže GIL pa se predobrada preklapa s inferencijom.
+        """
+        while True:
+            traffic_data_batch, future, single = self._pre_q.get()
+            if traffic_data_batch is None:
+                # Kontrolna stavka ide dalje nepromijenjena
+                self._post_q.put((None, future, single))
+                continue
+            try:
+                prepared = [self._prepare_window(traffic_data) for traffic_data in traffic_data_batch]
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            self._post_q.put((prepared, future, single))
+    
+    def _infer_loop(self):
+        """
+        Dretva za inferenciju: uzima do PIPELINE_MAX_BATCH zahtjeva iz reda,
+        poziva model jednom za sve njihove prozore i postavlja rezultate.
+        Jedina mijenja povijest, pa se prozori obrađuju redom predaje.
+        """
+        while True:
+            items = [self._post_q.get()]
+            # Kontrolna stavka zaključuje skupinu kako bi se izvršila nakon prozora predanih prije nje
+            while len(items) < PIPELINE_MAX_BATCH and items[-1][0] is not None:
+                try:
+                    items.append(self._post_q.get_nowait())
+                except queue.Empty:
+                    break
             
-            # Računanje konfidencije
-            confidence = q_values[action]
+            control = items.pop() if items[-1][0] is None else None
+            if items:
+                self._infer_items(items)
+            
+            if control is not None:
+                _, future, fn = control
+                try:
+                    future.set_result(fn())
+                except Exception as e:
+                    future.set_exception(e)
+    
+    def _infer_items(self, items):
+        """
+        Detektira napade za prozore skupine zahtjeva i postavlja njihove rezultate.
+        
+        Args:
+            items: Lista trojki (pripremljeni prozori, Future, single)
+        """
+        prepared = [window for item in items for window in item[0]]
+        try:
+            results = self._detect_prepared(prepared)
+        except Exception as e:
+            for _, future, _ in items:
+                future.set_exception(e)
+            return
+        
+        offset = 0
+        for windows, future, single in items:
+            chunk = results[offset:offset + len(windows)]
+            offset += len(windows)
+            future.set_result(chunk[0] if single else chunk)
+    
+    def _detect_prepared(self, prepared):
+        """
+        Dodaje pripremljene prozore u povijest i detektira napade.
+        
+        Args:
+            prepared: Lista parova (stupci prometa, vektor značajki)
+            
+        Returns:
+            list: Rezultat detekcije za svaki prozor, istim redom
+        """
+        # Detekcija napada pomoću DDQN modela
+        if not self.ddqn_agent:
+            for traffic_data, window_features in prepared:
+                self._push_window(traffic_data, window_features)
+            return [self._model_unavailable_result() for _ in prepared]
+        
+        # Jeftini filtar se ne primjenjuje dok je napad u tijeku, kako bi se
+        # i spori napadi s malo prometa pratili modelom do kraja
+        if self.cheap_gate and not self.attack_in_progress:
+            gated = [self._is_clearly_benign(window_features) for _, window_features in prepared]
+        else:
+            gated = [False] * len(prepared)
+        
+        if not NUMPY_AVAILABLE or not hasattr(self.ddqn_agent, "predict_batch"):
+            results = []
+            for (traffic_data, window_features), skip_model in zip(prepared, gated):
+                features, state = self._push_window(traffic_data, window_features)
+                if skip_model:
+                    results.append(self._gated_result(features[-1]))
+                    continue
+                action, q_values = self.ddqn_agent.predict(state)
+                results.append(self._handle_prediction(features[-1], action, q_values))
+            return results
+        
+        # Prozori idu u povijest redom, a u matricu stanja samo oni koje filtar nije propustio
+        batch_size = len(prepared)
+        states = np.empty((batch_size - sum(gated), self.window_size * 8), dtype=np.float32)
+        current_features = []
+        model_rows = {}
+        for i, (traffic_data, window_features) in enumerate(prepared):
+            features, state = self._push_window(traffic_data, window_features)
+            current_features.append(features[-1])
+            if not gated[i]:
+                states[len(model_rows)] = state
+                model_rows[i] = len(model_rows)
+        
+        if model_rows:
+            actions, q_values = self.ddqn_agent.predict_batch(states)
+        
+        # Ažuriranje povijesti napada ide redom, samo nad malim poljem predikcija
+        results = []
+        for i in range(batch_size):
+            if gated[i]:
+                results.append(self._gated_result(current_features[i]))
+            else:
+                row = model_rows[i]
+                results.append(self._handle_prediction(current_features[i], actions[row], q_values[row]))
+        return results
+    
+    def _is_clearly_benign(self, window_features):
+        """
+        Jeftini filtar: prozor je očito benigan ako su broj paketa, ukupni bajtovi
+        i broj izvorišnih adresa svi ispod GATE_MAX_* pragova. Pragovi se
+        uspoređuju s već normaliziranim značajkama prozora.
+        
+        Args:
+            window_features: Vektor značajki prozora
             
-            # Provjera je li detektiran napad
-            is_attack = action == 1
+        Returns:
+            bool: True ako se model može preskočiti
+        """
+        return (
+            window_features[4] < GATE_MAX_PACKETS / 500.0
+            and window_features[3] < GATE_MAX_BYTES / 1000000
+            and window_features[5] < GATE_MAX_SOURCES / 100.0
+        )
+    
+    def _gated_result(self, current_features):
+        """
+        Rezultat za prozor koji je jeftini filtar propustio bez modela; stanje
+        napada se ažurira kao za predikciju "nije napad".
+        """
+        result = self._handle_prediction(current_features, 0, [0.0, 0.0])
+        result["gate"] = "cheap"
+        return result
+    
+    def _handle_prediction(self, current_features, action, q_values):
+        """
+        Ažurira stanje napada na temelju predikcije modela i gradi rezultat detekcije.
+        
+        Args:
+            current_features: Vektor značajki najnovijeg prozora
+            action: Akcija koju je odabrao model
+            q_values: Q-vrijednosti modela
             
-            # Ažuriranje povijesti napada
-            now = datetime.now()
+        Returns:
+            dict: Rezultati detekcije
+        """
+        # Računanje konfidencije
+        confidence = q_values[action]
+        
+        # Provjera je li detektiran napad
+        is_attack = action == 1
+        
+        # Ažuriranje povijesti napada; vrijeme se dohvaća i formatira jednom po
+        # predikciji, a trajanja se računaju iz epoch sekundi bez parsiranja ISO zapisa
+        now_ts = time.time()
+        now_iso = datetime.fromtimestamp(now_ts).isoformat()
+        
+        # Ako je detektiran napad, ažuriraj povijest
+        if is_attack:
+            # Tip i težina napada procjenjuju se jednim prolazom kroz značajke
+            attack_type, severity = self._classify(current_features)
             
-            # Ako je detektiran napad, ažuriraj povijest
-            if is_attack:
-                # Ako nije u tijeku napad, započni novi
-                if not self.attack_in_progress:
-                    self.attack_in_progress = True
-                    self.last_attack_time = now
+            # Ako nije u tijeku napad, započni novi
+            if not self.attack_in_progress:
+                self.attack_in_progress = True
+                self.last_attack_time = datetime.fromtimestamp(now_ts)
+                self._last_attack_epoch = now_ts
+                self._last_attack_iso = now_iso
+                self.last_attack_type = attack_type
+                
+                # Zabilježi napad
+                self._history_version += 1
+                self.attack_history.append({
+                    "start_time": now_iso,
+                    "type": attack_type,
+                    "confidence": confidence,
+                    "severity": severity
+                })
+            else:
+                # Ako je napad već u tijeku, ažuriraj zadnji napad
+                if self.attack_history:
+                    self._history_version += 1
+                    self.attack_history[-1]["last_detection"] = now_iso
+                    self.attack_history[-1]["confidence"] = max(self.attack_history[-1].get("confidence", 0), confidence)
                     
-                    # Procijeni tip napada na temelju značajki
-                    attack_type = self._estimate_attack_type(features[-1])
-                    self.last_attack_type = attack_type
+                    # Ažuriraj težinu napada
+                    self.attack_history[-1]["severity"] = max(self.attack_history[-1].get("severity", 0), severity)
+                    self.current_attack_severity = severity
+        else:
+            # Ako je napad završio
+            if self.attack_in_progress:
+                # Provjeri je li prošlo dovoljno vremena bez detekcije za završetak napada
+                if self.last_attack_time and now_ts - self._last_attack_epoch > 30:
+                    self.attack_in_progress = False
                     
-                    # Zabilježi napad
-                    self.attack_history.append({
-                        "start_time": now.isoformat(),
-                        "type": attack_type,
-                        "confidence": confidence,
-                        "severity": self._estimate_attack_severity(features[-1])
-                    })
-                else:
-                    # Ako je napad već u tijeku, ažuriraj zadnji napad
+                    # Označi kraj napada u povijesti
                     if self.attack_history:
-                        self.attack_history[-1]["last_detection"] = now.isoformat()
-                        self.attack_history[-1]["confidence"] = max(self.attack_history[-1].get("confidence", 0), confidence)
+                        self._history_version += 1
+                        self.attack_history[-1]["end_time"] = now_iso
                         
-                        # Ažuriraj težinu napada
-                        severity = self._estimate_attack_severity(features[-1])
-                        self.attack_history[-1]["severity"] = max(self.attack_history[-1].get("severity", 0), severity)
-                        self.current_attack_severity = severity
-            else:
-                # Ako je napad završio
-                if self.attack_in_progress:
-                    # Provjeri je li prošlo dovoljno vremena bez detekcije za završetak napada
-                    if self.last_attack_time and (now - self.last_attack_time).total_seconds() > 30:
-                        self.attack_in_progress = False
-                        
-                        # Označi kraj napada u povijesti
-                        if self.attack_history:
-                            self.attack_history[-1]["end_time"] = now.isoformat()
-                            
-                            # Računanje trajanja napada
-                            start_time = datetime.fromisoformat(self.attack_history[-1]["start_time"])
-                            duration = (now - start_time).total_seconds()
-                            self.attack_history[-1]["duration"] = duration
-            
-            # Izgradnja rezultata
-            result = {
-                "timestamp": now.isoformat(),
-                "is_attack": is_attack,
-                "confidence": confidence,
-                "action": action,
-                "q_values": q_values,
-                "attack_in_progress": self.attack_in_progress,
-                "current_attack": {
-                    "type": self.last_attack_type,
-                    "start_time": self.last_attack_time.isoformat() if self.last_attack_time else None,
-                    "duration": (now - self.last_attack_time).total_seconds() if self.last_attack_time else 0,
-                    "severity": self.current_attack_severity
-                } if self.attack_in_progress else None,
-                "recent_attacks": self.attack_history[-5:] if self.attack_history else []
-            }
+                        # Računanje trajanja napada; zadnji zapis je napad koji je započeo u _last_attack_epoch
+                        self.attack_history[-1]["duration"] = now_ts - self._last_attack_epoch
+        
+        # Izgradnja rezultata
+        result = {
+            "timestamp": now_iso,
+            "is_attack": is_attack,
+            "confidence": confidence,
+            "action": action,
+            "q_values": q_values,
+            "attack_in_progress": self.attack_in_progress,
+            "current_attack": {
+                "type": self.last_attack_type,
+                "start_time": self._last_attack_iso if self.last_attack_time else None,
+                "duration": now_ts - self._last_attack_epoch if self.last_attack_time else 0,
+                "severity": self.current_attack_severity
+            } if self.attack_in_progress else None,
+            "recent_attacks": self.get_attack_history(limit=5)
+        }
+        
+        return result
+    
+    def _classify(self, features):
+        """
+        Procjenjuje tip i težinu napada; značajke se pretvaraju u polje samo jednom.
+        
+        Args:
+            features: Vektor značajki
             
-            return result
-        else:
-            # Ako model nije dostupan, vrati jednostavan rezultat
-            return {
-                "timestamp": datetime.now().isoformat(),
-                "is_attack": False,
-                "confidence": 0.0,
-                "message": "Model nije dostupan za detekciju"
-            }
+        Returns:
+            tuple: (procijenjeni tip napada, procjena težine napada [0, 1])
+        """
+        if NUMPY_AVAILABLE and not isinstance(features, np.ndarray):
+            features = np.asarray(features, dtype=np.float64)
+        return self._estimate_attack_type(features), self._estimate_attack_severity(features)
     
     def _estimate_attack_type(self, features):
         """
@@ -344,6 +919,14 @@ class DDoSDetector:
         Returns:
             str: Procijenjeni tip napada
         """
+        if NUMPY_AVAILABLE:
+            # Sva pravila se provjeravaju odjednom; argmax vraća prvo zadovoljeno pravilo
+            arr = features if isinstance(features, np.ndarray) else np.asarray(features, dtype=np.float64)
+            checks = np.where(self._RULE_SIGNS > 0, arr > self._RULE_THRESHOLDS, arr < self._RULE_THRESHOLDS)
+            matches = np.all(checks | (self._RULE_SIGNS == 0), axis=1)
+            idx = int(np.argmax(matches))
+            return self._RULE_NAMES[idx] if matches[idx] else "Unknown Attack"
+        
         # Raspakiranje značajki
         source_entropy, destination_entropy, syn_ratio, traffic_volume, packet_rate, unique_src_count, unique_dst_count, protocol_imbalance = features
         
@@ -373,6 +956,12 @@ class DDoSDetector:
         Returns:
             float: Procjena težine napada [0, 1]
         """
+        if NUMPY_AVAILABLE:
+            # Skalarni produkt s vektorom težina umjesto pojedinačnih množenja
+            arr = features if isinstance(features, np.ndarray) else np.asarray(features, dtype=np.float64)
+            severity = float(arr @ self._SEV_WEIGHTS) + self._SEV_BIAS
+            return severity if severity < 1.0 else 1.0
+        
         # Raspakiranje značajki
         source_entropy, destination_entropy, syn_ratio, traffic_volume, packet_rate, unique_src_count, unique_dst_count, protocol_imbalance = features
         
@@ -465,25 +1054,84 @@ class DDoSDetector:
                 "duration": 300  # 5 minuta
             }
     
-    def get_attack_history(self, limit=10):
+    def warm_up(self):
         """
-        Vraća povijest detektiranih napada.
+        Propušta mali uzorak prometa kroz detect i recommend_action kako bi se
+        unaprijed kompilirale Numba jezgre i pripremio graf modela, pa prvi pravi
+        zahtjev ne plaća te troškove. Stanje detektora ostaje nepromijenjeno.
+        Izvršava se u dretvi za inferenciju, pa istovremene detekcije ne vide
+        privremeno stanje zagrijavanja.
+        
+        Returns:
+            float: Trajanje zagrijavanja u sekundama
+        """
+        return self._run_on_pipeline(self._warm_up)
+    
+    def _warm_up(self):
+        """
+        Tijelo warm_up; poziva se samo iz dretve za inferenciju.
+        """
+        saved_state = {
+            name: getattr(self, name)
+            for name in ("traffic_history", "_window_features", "attack_history", "last_attack_time",
+                         "_last_attack_epoch", "_last_attack_iso", "last_attack_type", "attack_in_progress",
+                         "current_attack_severity", "_history_version", "cheap_gate")
+        }
+        self.traffic_history = deque(maxlen=MAX_TRAFFIC_HISTORY)
+        self._window_features = deque(maxlen=self.window_size)
+        self.attack_history = deque(maxlen=MAX_ATTACK_HISTORY)
+        # Uzorak je malen pa bi ga jeftini filtar propustio bez modela
+        self.cheap_gate = False
+        
+        start = time.perf_counter()
+        try:
+            self.recommend_action(self._detect_prepared([self._prepare_window(_WARM_UP_TRAFFIC)])[0])
+        finally:
+            for name, value in saved_state.items():
+                setattr(self, name, value)
+        return time.perf_counter() - start
+    
+    def get_attack_history(self, limit=10, since=None):
+        """
+        Vraća povijest detektiranih napada (najnovijih limit zapisa, kronološki).
         
         Args:
-            limit: Maksimalni broj napada za vraćanje
+            limit: Maksimalni broj napada za vraćanje (0 ili manje - svi)
+            since: ISO vrijeme; vraćaju se samo napadi započeti nakon njega
             
         Returns:
             list: Povijest napada
         """
-        return self.attack_history[-limit:] if self.attack_history else []
+        available = len(self.attack_history)
+        if since is not None:
+            # Zapisi se dodaju kronološki, pa je povijest sortirana po start_time
+            available -= bisect.bisect_right(self.attack_history, since, key=lambda attack: attack["start_time"])
+        
+        count = available if limit <= 0 else min(limit, available)
+        
+        # Čita se samo zadnjih count zapisa, bez kopiranja cijele povijesti
+        recent = list(islice(reversed(self.attack_history), count))
+        recent.reverse()
+        return recent
     
     def reset(self):
         """
-        Resetira stanje detektora.
+        Resetira stanje detektora. Reset se izvršava u dretvi za inferenciju,
+        nakon prozora predanih prije njega.
         """
-        self.traffic_history = []
-        self.attack_history = []
+        self._run_on_pipeline(self._reset_state)
+    
+    def _reset_state(self):
+        """
+        Tijelo reset; poziva se samo iz dretve za inferenciju.
+        """
+        self.traffic_history = deque(maxlen=MAX_TRAFFIC_HISTORY)
+        self._window_features.clear()
+        self.attack_history = deque(maxlen=MAX_ATTACK_HISTORY)
+        self._history_version += 1
         self.last_attack_time = None
+        self._last_attack_epoch = 0.0
+        self._last_attack_iso = None
         self.last_attack_type = None
         self.attack_in_progress = False
         self.current_attack_severity = 0.0
@@ -536,21 +1184,6 @@ class DDoSDetector:
             return self.ddqn_agent.evaluate(processed_data, labels)
 
 
-# Fallback funkcija za logaritam ako math modul nije dostupan
-def math_log2_fallback(x):
-    """
-    Fallback implementacija logaritma (baza 2) ako math modul nije dostupan.
-    
-    Args:
-        x: Vrijednost za logaritmiranje
-        
-    Returns:
-        float: Logaritam baze 2
-    """
-    import math
-    return math.log2(x)
-
-
 # Globalna instanca detektora
 _detector_instance = None
 
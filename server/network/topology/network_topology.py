@@ -7,6 +7,30 @@ import networkx as nx
 import numpy as np
 import json
 import os
+import math
+import threading
+from collections import defaultdict
+
+# Optional compiled graph backend for centrality metrics
+try:
+    import igraph as ig
+    IGRAPH_AVAILABLE = True
+except ImportError:
+    IGRAPH_AVAILABLE = False
+
+# Optional parallel (C++/OpenMP) Louvain implementation for community detection
+try:
+    import networkit as nk
+    NETWORKIT_AVAILABLE = True
+except ImportError:
+    NETWORKIT_AVAILABLE = False
+
+# Above this many nodes, NetworkX betweenness is estimated from a sample of
+# source nodes (Brandes-Pich) instead of running a BFS from every node
+BETWEENNESS_EXACT_MAX_NODES = 50
+
+# Column of each node type in the per-community type count matrix
+TYPE_IDX = {'router': 0, 'switch': 1, 'server': 2, 'client': 3, 'attacker': 4}
 
 class NetworkTopologyAnalyzer:
     """
@@ -21,8 +45,24 @@ class NetworkTopologyAnalyzer:
     
     def __init__(self):
         self.G = nx.DiGraph()
+        # Read-only undirected view of G for community detection; _build_graph
+        # refills G in place, so the view always reflects the current graph
+        self._G_undirected = self.G.to_undirected(as_view=True)
         self.nodes = []
         self.links = []
+        # igraph copy of G (same vertex order), rebuilt in _build_graph
+        self._ig = None
+        # Analysis results keyed by (graph signature, analysis name); cleared in _build_graph
+        self._graph_sig = None
+        self._analysis_cache = {}
+        self._cache_lock = threading.Lock()
+        # Nodes grouped by type and the attacked servers, rebuilt in _build_graph
+        self._nodes_by_type = defaultdict(list)
+        self._attacked_servers = []
+        # Upstream node of every node when the topology is a directed tree, else None
+        self._parent = None
+        # Display name of every node id, rebuilt in _build_graph
+        self._id_to_name = {}
         self.node_types = {
             'router': {'size': 15, 'color': '#3B82F6'},
             'switch': {'size': 12, 'color': '#10B981'},
@@ -130,6 +170,23 @@ class NetworkTopologyAnalyzer:
         """Build NetworkX graph from nodes and links"""
         self.G.clear()
         
+        # Any cached analysis belongs to the previous graph
+        with self._cache_lock:
+            self._graph_sig = hash((
+                tuple((n['id'], n.get('status', 'normal')) for n in self.nodes),
+                tuple((l['source'], l['target'], l.get('status', 'normal')) for l in self.links)
+            ))
+            self._analysis_cache = {}
+        
+        # Index nodes by type (and names by id) so analyses do not rescan the
+        # node list or go through G's node attribute views
+        self._nodes_by_type = defaultdict(list)
+        self._id_to_name = {}
+        for node in self.nodes:
+            self._nodes_by_type[node.get('type')].append(node)
+            self._id_to_name[node['id']] = node['name']
+        self._attacked_servers = [n for n in self._nodes_by_type['server'] if n.get('status') == 'attack']
+        
         # Add nodes
         for node in self.nodes:
             self.G.add_node(
@@ -148,6 +205,20 @@ class NetworkTopologyAnalyzer:
                 link['target'], 
                 status=link.get('status', 'normal')
             )
+        
+        # In a hierarchical topology every node has at most one upstream node and
+        # there are no cycles, so the only path to a node is its chain of parents
+        if self.G.number_of_nodes() and nx.is_branching(self.G):
+            self._parent = {target: source for source, target in self.G.edges()}
+        else:
+            self._parent = None
+        
+        # Mirror the graph in igraph so centrality runs in compiled code;
+        # taking nodes/edges from G keeps its ordering and de-duplicated edges
+        if IGRAPH_AVAILABLE:
+            self._ig = ig.Graph(directed=True)
+            self._ig.add_vertices(list(self.G.nodes()))
+            self._ig.add_edges(list(self.G.edges()))
     
     def get_topology(self):
         """
@@ -156,13 +227,15 @@ class NetworkTopologyAnalyzer:
         Returns:
             dict: Network topology with nodes and links
         """
+        nodes_by_type = self._nodes_by_type
+        
         return {
             'nodes': self.nodes,
             'links': self.links,
             'structure': [
                 {'layer': 'Core Layer', 'devices': '1 Router', 'status': 'Operational'},
-                {'layer': 'Distribution Layer', 'devices': f"{len([n for n in self.nodes if n['type'] == 'switch'])} Switches", 'status': 'Operational'},
-                {'layer': 'Access Layer', 'devices': f"{len([n for n in self.nodes if n['type'] == 'server'])} Servers, {len([n for n in self.nodes if n['type'] == 'client'])} Hosts", 'status': '1 Server Under Attack' if any(n.get('status') == 'attack' for n in self.nodes if n['type'] == 'server') else 'Operational'}
+                {'layer': 'Distribution Layer', 'devices': f"{len(nodes_by_type['switch'])} Switches", 'status': 'Operational'},
+                {'layer': 'Access Layer', 'devices': f"{len(nodes_by_type['server'])} Servers, {len(nodes_by_type['client'])} Hosts", 'status': '1 Server Under Attack' if self._attacked_servers else 'Operational'}
             ],
             'attackDetails': self._get_attack_details()
         }
@@ -174,21 +247,40 @@ class NetworkTopologyAnalyzer:
         Returns:
             dict: Attack details
         """
-        # Find attacked servers
-        attacked_servers = [n for n in self.nodes if n.get('type') == 'server' and n.get('status') == 'attack']
-        attacked_server = attacked_servers[0]['name'] if attacked_servers else "None"
-        
-        # Find attacker nodes
-        attackers = [n for n in self.nodes if n.get('type') == 'attacker']
-        attacker_count = len(attackers)
+        # Attacked server and number of attacker nodes
+        attacked_server = self._attacked_servers[0]['name'] if self._attacked_servers else "None"
+        attacker_count = len(self._nodes_by_type['attacker'])
         
         return {
             'target': attacked_server,
             'type': 'TCP SYN Flood',
             'sources': f"{attacker_count} malicious IPs",
-            'status': 'Active' if attacked_servers else 'None'
+            'status': 'Active' if self._attacked_servers else 'None'
         }
     
+    def _cached(self, name, compute):
+        """
+        Return a cached analysis result for the current graph, computing it on first use
+        
+        Args:
+            name (str): Analysis name
+            compute (callable): Function computing the result
+            
+        Returns:
+            The (possibly cached) analysis result
+        """
+        key = (self._graph_sig, name)
+        with self._cache_lock:
+            if key in self._analysis_cache:
+                return self._analysis_cache[key]
+        
+        # Computed outside the lock; concurrent first calls may both compute the same result
+        result = compute()
+        with self._cache_lock:
+            if key[0] == self._graph_sig:
+                self._analysis_cache[key] = result
+        return result
+    
     def calculate_centrality_metrics(self):
         """
         Calculate various centrality metrics for the nodes in the graph
@@ -196,21 +288,34 @@ class NetworkTopologyAnalyzer:
         Returns:
             dict: Dictionary of centrality metrics
         """
-        # Degree centrality
-        degree_centrality = nx.degree_centrality(self.G)
-        
-        # Closeness centrality
-        try:
-            closeness_centrality = nx.closeness_centrality(self.G)
-        except:
-            # Handle disconnected graph
-            closeness_centrality = {node: 0 for node in self.G.nodes()}
-        
-        # Betweenness centrality
-        try:
-            betweenness_centrality = nx.betweenness_centrality(self.G)
-        except:
-            betweenness_centrality = {node: 0 for node in self.G.nodes()}
+        return self._cached('centrality', self._calculate_centrality_metrics)
+    
+    def _calculate_centrality_metrics(self):
+        """Uncached implementation of calculate_centrality_metrics"""
+        if self._ig is not None:
+            degree_centrality, closeness_centrality, betweenness_centrality = self._igraph_centrality()
+        else:
+            # Degree centrality
+            degree_centrality = nx.degree_centrality(self.G)
+            
+            # Closeness centrality
+            try:
+                closeness_centrality = nx.closeness_centrality(self.G)
+            except:
+                # Handle disconnected graph
+                closeness_centrality = {node: 0 for node in self.G.nodes()}
+            
+            # Betweenness centrality; on large graphs k sampled sources give an
+            # unbiased estimate (NetworkX rescales by n/k) at O(km) instead of O(nm)
+            try:
+                n = self.G.number_of_nodes()
+                if n > BETWEENNESS_EXACT_MAX_NODES:
+                    k = max(16, int(math.sqrt(n)))
+                    betweenness_centrality = nx.betweenness_centrality(self.G, k=k, seed=0)
+                else:
+                    betweenness_centrality = nx.betweenness_centrality(self.G)
+            except:
+                betweenness_centrality = {node: 0 for node in self.G.nodes()}
         
         # Find the most critical nodes
         max_degree_node = max(degree_centrality.items(), key=lambda x: x[1])[0]
@@ -218,9 +323,9 @@ class NetworkTopologyAnalyzer:
         max_betweenness_node = max(betweenness_centrality.items(), key=lambda x: x[1])[0]
         
         # Get node names
-        max_degree_name = self.G.nodes[max_degree_node]['name']
-        max_closeness_name = self.G.nodes[max_closeness_node]['name']
-        max_betweenness_name = self.G.nodes[max_betweenness_node]['name']
+        max_degree_name = self._id_to_name[max_degree_node]
+        max_closeness_name = self._id_to_name[max_closeness_node]
+        max_betweenness_name = self._id_to_name[max_betweenness_node]
         
         centrality_metrics = [
             {'name': f"Degree Centrality ({max_degree_name})", 'value': degree_centrality[max_degree_node]},
@@ -230,6 +335,60 @@ class NetworkTopologyAnalyzer:
         
         return centrality_metrics
     
+    def _igraph_centrality(self):
+        """
+        Calculate degree, closeness and betweenness centrality with igraph,
+        scaled the same way as the NetworkX functions
+        
+        Returns:
+            tuple: Degree, closeness and betweenness centrality dicts keyed by node id
+        """
+        g = self._ig
+        n = g.vcount()
+        ids = g.vs['name']
+        
+        # Degree centrality: (in + out degree) / (n - 1)
+        degree_scale = 1.0 / (n - 1) if n > 1 else 1.0
+        degree = [d * degree_scale for d in g.degree(mode='all')]
+        
+        # Closeness centrality over incoming distances, with the Wasserman-Faust
+        # correction NetworkX applies for nodes that only some nodes can reach
+        closeness = [0.0] * n
+        if n > 1:
+            reachable = g.neighborhood_size(order=n, mode='in')
+            for i, c in enumerate(g.closeness(mode='in', normalized=True)):
+                r = reachable[i] - 1
+                if r > 0 and c == c:
+                    closeness[i] = c * r / (n - 1)
+        
+        # Betweenness centrality, normalised by (n - 1)(n - 2) for directed graphs
+        betweenness_scale = 1.0 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+        betweenness = [b * betweenness_scale for b in g.betweenness(directed=True)]
+        
+        return dict(zip(ids, degree)), dict(zip(ids, closeness)), dict(zip(ids, betweenness))
+    
+    def _tree_path(self, source, target):
+        """
+        Path from source to target in a tree-shaped topology, found by walking
+        up the parent map from target (O(depth), no BFS)
+        
+        Args:
+            source (str): Source node id
+            target (str): Target node id
+            
+        Returns:
+            list: Node ids from source to target, or None if source is not upstream of target
+        """
+        path = [target]
+        node = target
+        while node != source:
+            node = self._parent.get(node)
+            if node is None:
+                return None
+            path.append(node)
+        path.reverse()
+        return path
+    
     def find_attack_paths(self):
         """
         Find potential attack paths in the network
@@ -237,11 +396,15 @@ class NetworkTopologyAnalyzer:
         Returns:
             dict: Information about the most critical attack path
         """
+        return self._cached('attack_paths', self._find_attack_paths)
+    
+    def _find_attack_paths(self):
+        """Uncached implementation of find_attack_paths"""
         # Find attacker nodes
-        attackers = [n['id'] for n in self.nodes if n.get('type') == 'attacker']
+        attackers = [n['id'] for n in self._nodes_by_type['attacker']]
         
         # Find target nodes (servers with attack status)
-        targets = [n['id'] for n in self.nodes if n.get('type') == 'server' and n.get('status') == 'attack']
+        targets = [n['id'] for n in self._attacked_servers]
         
         if not attackers or not targets:
             return {
@@ -249,35 +412,39 @@ class NetworkTopologyAnalyzer:
                 'score': '0/10'
             }
         
-        # Find shortest paths from attackers to targets
-        shortest_paths = []
+        # Find the shortest attacker -> target path; only path lengths are compared,
+        # and the node list is built once for the winner. The first pair with the
+        # minimum length wins, as with the previous stable sort by length
+        critical_path = None
         
         for attacker in attackers:
+            # One BFS per attacker gives its distances to every target;
+            # tree-shaped topologies walk the parent map instead
+            lengths = nx.single_source_shortest_path_length(self.G, attacker) if self._parent is None else None
             for target in targets:
-                try:
-                    path = nx.shortest_path(self.G, source=attacker, target=target)
-                    path_names = [self.G.nodes[node]['name'] for node in path]
-                    shortest_paths.append({
-                        'path': ' → '.join(path_names),
-                        'length': len(path),
-                        'attacker': attacker,
-                        'target': target
-                    })
-                except nx.NetworkXNoPath:
+                if lengths is None:
+                    path = self._tree_path(attacker, target)
+                    length = len(path) if path is not None else None
+                else:
+                    path = None
+                    distance = lengths.get(target)
+                    length = distance + 1 if distance is not None else None
+                
+                if length is None:
                     # No path exists
-                    pass
+                    continue
+                if critical_path is None or length < critical_path['length']:
+                    critical_path = {'length': length, 'attacker': attacker, 'target': target, 'nodes': path}
         
-        if not shortest_paths:
+        if critical_path is None:
             return {
                 'path': 'No attack path detected',
                 'score': '0/10'
             }
         
-        # Sort paths by length (shorter paths are more critical)
-        shortest_paths.sort(key=lambda x: x['length'])
-        
-        # Choose the most critical path (shortest)
-        critical_path = shortest_paths[0]
+        # Build the node list and names for the most critical (shortest) path only
+        path = critical_path['nodes'] or nx.shortest_path(self.G, critical_path['attacker'], critical_path['target'])
+        critical_path['path'] = ' → '.join(self._id_to_name[node] for node in path)
         
         # Calculate a vulnerability score (0-10) based on path length
         # Shorter paths are more vulnerable
@@ -297,64 +464,65 @@ class NetworkTopologyAnalyzer:
         Returns:
             list: Information about detected communities
         """
-        # Convert directed graph to undirected for community detection
-        G_undirected = self.G.to_undirected()
+        return self._cached('communities', self._detect_communities)
+    
+    def _detect_communities(self):
+        """Uncached implementation of detect_communities"""
+        # Undirected view of the directed graph for community detection (no copy)
+        G_undirected = self._G_undirected
         
-        try:
-            # Apply Louvain community detection
-            from community import best_partition
-            partition = best_partition(G_undirected)
-        except ImportError:
-            # If community package not available, fall back to connected components
-            communities = list(nx.connected_components(G_undirected))
-            partition = {}
-            for i, comm in enumerate(communities):
-                for node in comm:
-                    partition[node] = i
-        
-        # Count node types in each community
-        community_stats = {}
+        partition = None
+        if NETWORKIT_AVAILABLE:
+            partition = self._networkit_partition(G_undirected)
+        
+        if partition is None:
+            try:
+                # Apply Louvain community detection
+                from community import best_partition
+                partition = best_partition(G_undirected)
+            except ImportError:
+                # If community package not available, fall back to connected components
+                communities = list(nx.connected_components(G_undirected))
+                partition = {}
+                for i, comm in enumerate(communities):
+                    for node in comm:
+                        partition[node] = i
+        
+        # Count node types in each community: one row per community, one column per type
+        ncomm = max(partition.values()) + 1 if partition else 0
+        type_counts = np.zeros((ncomm, len(TYPE_IDX)), dtype=np.int32)
+        attacked = np.zeros(ncomm, dtype=bool)
         for node, community_id in partition.items():
-            if community_id not in community_stats:
-                community_stats[community_id] = {
-                    'router': 0,
-                    'switch': 0,
-                    'server': 0,
-                    'client': 0,
-                    'attacker': 0,
-                    'size': 0,
-                    'attacked': False
-                }
-            
-            node_type = self.G.nodes[node]['type']
-            community_stats[community_id][node_type] += 1
-            community_stats[community_id]['size'] += 1
+            attrs = self.G.nodes[node]
+            type_counts[community_id, TYPE_IDX[attrs['type']]] += 1
             
             # Check if this community contains attacked nodes
-            if self.G.nodes[node].get('status') == 'attack':
-                community_stats[community_id]['attacked'] = True
+            if attrs.get('status') == 'attack':
+                attacked[community_id] = True
+        sizes = type_counts.sum(axis=1)
         
         # Create readable community descriptions
         community_descriptions = []
         colors = ['bg-[#3B82F6]', 'bg-[#F59E0B]', 'bg-[#EF4444]']
         color_index = 0
         
-        for community_id, stats in community_stats.items():
-            if stats['server'] > 0:
-                if stats['attacked']:
-                    description = f"Cluster {community_id+1}: Attack targets ({stats['server']} node{'s' if stats['server'] > 1 else ''})"
+        for community_id in np.flatnonzero(sizes).tolist():
+            servers, attackers, clients = type_counts[community_id, [TYPE_IDX['server'], TYPE_IDX['attacker'], TYPE_IDX['client']]].tolist()
+            if servers > 0:
+                if attacked[community_id]:
+                    description = f"Cluster {community_id+1}: Attack targets ({servers} node{'s' if servers > 1 else ''})"
                     color = 'bg-[#EF4444]'  # Red for attacked clusters
-                elif stats['server'] > 1:
-                    description = f"Cluster {community_id+1}: Web servers ({stats['server']} nodes)"
+                elif servers > 1:
+                    description = f"Cluster {community_id+1}: Web servers ({servers} nodes)"
                     color = 'bg-[#3B82F6]'  # Blue for web servers
                 else:
-                    description = f"Cluster {community_id+1}: Database servers ({stats['server']} node)"
+                    description = f"Cluster {community_id+1}: Database servers ({servers} node)"
                     color = 'bg-[#F59E0B]'  # Orange for DB servers
-            elif stats['attacker'] > 0:
-                description = f"Cluster {community_id+1}: Attacker group ({stats['attacker']} node{'s' if stats['attacker'] > 1 else ''})"
+            elif attackers > 0:
+                description = f"Cluster {community_id+1}: Attacker group ({attackers} node{'s' if attackers > 1 else ''})"
                 color = 'bg-[#EF4444]'  # Red for attacker groups
             else:
-                description = f"Cluster {community_id+1}: Client group ({stats['client']} node{'s' if stats['client'] > 1 else ''})"
+                description = f"Cluster {community_id+1}: Client group ({clients} node{'s' if clients > 1 else ''})"
                 color = colors[color_index % len(colors)]
                 color_index += 1
             
@@ -365,6 +533,32 @@ class NetworkTopologyAnalyzer:
         
         return community_descriptions
     
+    def _networkit_partition(self, G_undirected):
+        """
+        Louvain partition computed by NetworKit's parallel PLM
+        
+        Args:
+            G_undirected (nx.Graph): Undirected view of the topology
+            
+        Returns:
+            dict: Community id (0..k-1, in order of first node) per node id, or None on failure
+        """
+        try:
+            nodes = list(G_undirected.nodes())
+            # nx2nk numbers nodes 0..n-1 in G_undirected.nodes() order
+            nkG = nk.nxadapter.nx2nk(G_undirected)
+            communities = nk.community.detectCommunities(nkG, algo=nk.community.PLM(nkG, refine=True), inspect=False)
+        except Exception as e:
+            print(f"NetworKit community detection failed: {e}")
+            return None
+        
+        # PLM subset ids are not contiguous; renumber them like best_partition does
+        ids = {}
+        return {
+            node: ids.setdefault(subset, len(ids))
+            for node, subset in zip(nodes, communities.getVector())
+        }
+    
     def get_vulnerability_analysis(self):
         """
         Get comprehensive vulnerability analysis of the network
@@ -392,8 +586,9 @@ class NetworkTopologyAnalyzer:
         traffic_paths = []
         
         # Get servers and clients/attackers
-        servers = [n for n in self.nodes if n.get('type') == 'server']
-        clients = [n for n in self.nodes if n.get('type') in ['client', 'attacker']]
+        servers = self._nodes_by_type['server']
+        # Clients and attackers in node order, which sets the path numbering
+        clients = [n for n in self.nodes if n.get('type') in ('client', 'attacker')]
         
         path_id = 1
         
@@ -414,26 +609,33 @@ class NetworkTopologyAnalyzer:
                 status = 'normal'
                 traffic_volume = '1.2K packets' if client['id'] == 'client5' else '0.8K packets'
             
-            # Find the path
-            try:
-                path = nx.shortest_path(self.G, source=client['id'], target=target_server['id'])
-                path_names = [self.G.nodes[node]['name'] for node in path]
-                hops = f"{len(path)-1} ({path_names[0]}→{path_names[1]}→{path_names[-1]})"
-                
-                traffic_paths.append({
-                    'id': path_id,
-                    'pathId': f"P-{path_id:03d}",
-                    'source': client['name'],
-                    'destination': target_server['name'],
-                    'hops': hops,
-                    'trafficVolume': traffic_volume,
-                    'status': status
-                })
-                
-                path_id += 1
-            except nx.NetworkXNoPath:
+            # Find the path; in a tree it is unique, otherwise nx.shortest_path
+            # picks among equally short paths
+            if self._parent is not None:
+                path = self._tree_path(client['id'], target_server['id'])
+            else:
+                try:
+                    path = nx.shortest_path(self.G, source=client['id'], target=target_server['id'])
+                except nx.NetworkXNoPath:
+                    path = None
+            if path is None:
                 # No path exists
-                pass
+                continue
+            
+            path_names = [self._id_to_name[node] for node in path]
+            hops = f"{len(path)-1} ({path_names[0]}→{path_names[1]}→{path_names[-1]})"
+            
+            traffic_paths.append({
+                'id': path_id,
+                'pathId': f"P-{path_id:03d}",
+                'source': client['name'],
+                'destination': target_server['name'],
+                'hops': hops,
+                'trafficVolume': traffic_volume,
+                'status': status
+            })
+            
+            path_id += 1
         
         return traffic_paths
 
@@ -13,7 +13,7 @@ import sys
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
 # Try to import numpy, but have fallback if it doesn't work
@@ -24,6 +24,15 @@ except ImportError:
     NUMPY_AVAILABLE = False
     print("Warning: NumPy not available, using basic Python lists instead")
 
+# Try to import orjson for faster JSON serialization of API responses
+try:
+    import orjson
+    from json_provider import ORJSONProvider
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("Warning: orjson not available, using Flask's standard JSON provider (pip install orjson)")
+
 # Set flags for available functionality
 TF_AVAILABLE = False
 DDQN_AVAILABLE = False
@@ -60,30 +69,56 @@ except ImportError as e:
     MONGO_AVAILABLE = False
     print(f"Warning: MongoDB support not available - {e}")
 
+# One pooled client for /mitigate alerts; PyMongo connects lazily and the
+# short selection timeout keeps alerting requests fast when MongoDB is down
+_ALERTS = None
+if MONGO_AVAILABLE:
+    try:
+        from pymongo import MongoClient
+        _MONGO = MongoClient(os.environ.get('MONGODB_URI', 'mongodb://localhost:27017'),
+                             maxPoolSize=50, serverSelectionTimeoutMS=200)
+        _ALERTS = _MONGO.ddos_defender.alerts
+    except Exception as e:
+        print(f"Warning: MongoDB alert client not available - {e}")
+
 print("Using basic algorithms for DDoS detection instead of TensorFlow-based DDQN")
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+if ORJSON_AVAILABLE:
+    # jsonify, request.json and the pre-serialized responses all go through app.json
+    app.json = ORJSONProvider(app)
 
 # Helper functions with no dependencies
 def normalize_state_simple(state):
     """Normalize state without NumPy"""
-    max_val = max(abs(x) for x in state) if state else 1
-    if max_val == 0:
-        max_val = 1
+    max_val = max(map(abs, state), default=0) or 1
     return [x / max_val for x in state]
 
 def normalize_state(state):
     """Normalize state with NumPy if available"""
     if NUMPY_AVAILABLE:
-        import numpy as np
-        if not isinstance(state, np.ndarray):
-            state = np.array(state)
-        return state / np.max(np.abs(state)) if np.max(np.abs(state)) > 0 else state
+        state = np.asarray(state, dtype=np.float64)
+        # Single reduction; asarray does not copy an existing float64 array
+        max_val = np.abs(state).max() if state.size else 0
+        return state / max_val if max_val > 0 else state
     else:
         return normalize_state_simple(state)
 
+# Algorithmic weights for the state features scored by /mitigate
+FEATURE_WEIGHTS = [
+    0.18,  # source_entropy
+    0.12,  # destination_entropy
+    0.25,  # syn_ratio
+    0.15,  # traffic_volume
+    0.20,  # packet_rate
+    0.05,  # unique_src_ips_count
+    0.02,  # unique_dst_ips_count
+    0.03   # protocol_distribution
+]
+_FEATURE_WEIGHTS = np.asarray(FEATURE_WEIGHTS, dtype=np.float64) if NUMPY_AVAILABLE else None
+
 def create_mitigation_action(action_index, intensity=None):
     """Create mitigation action details"""
     actions = [
@@ -329,12 +364,54 @@ def generate_mock_traffic_paths():
 
 def generate_mock_analysis_data():
     """Generate comprehensive analysis data for API response"""
-    # Get the current time
-    now = datetime.now()
+    analysis_data = generate_mock_analysis_dynamic_data()
+    analysis_data.update(ANALYSIS_STATIC_DATA)
+    return analysis_data
+
+# Parts of the analysis data that never change between requests
+ANALYSIS_STATIC_DATA = {
+    "protocol_distribution": [
+        {"protocol": "TCP", "percentage": 60},
+        {"protocol": "UDP", "percentage": 25},
+        {"protocol": "ICMP", "percentage": 10},
+        {"protocol": "Other", "percentage": 5}
+    ],
+    "feature_importance": {
+        "labels": ["SYN Ratio", "Packet Rate", "Entropy", "Source IP Diversity", "TTL Variance"],
+        "values": [0.35, 0.25, 0.2, 0.15, 0.05]
+    }
+}
+
+# Shared NumPy generator for batched mock values (None without NumPy)
+_RNG = np.random.default_rng() if NUMPY_AVAILABLE else None
+
+# Attack types with their (fixed) confidence and inclusive count range
+MOCK_ATTACK_CLASSES = [
+    ("TCP SYN Flood", 0.85, 10, 50),
+    ("UDP Flood", 0.65, 5, 30),
+    ("ICMP Flood", 0.45, 2, 20),
+    ("HTTP Flood", 0.75, 8, 40)
+]
+
+def generate_mock_analysis_dynamic_data():
+    """Generate the time-dependent and random parts of the analysis data"""
+    # Generate chronological time labels for the last 24 hours from the current
+    # hour alone, without building and formatting a datetime per label
+    current_hour = datetime.now().hour
+    hour_labels = [f"{(current_hour - i) % 24:02d}:00" for i in range(23, -1, -1)]
     
-    # Generate time labels for the last 24 hours
-    hour_labels = [(now - timedelta(hours=i)).strftime("%H:00") for i in range(24)]
-    hour_labels.reverse()  # Make chronological
+    # The 24-hour series and attack counts are drawn in single vectorized calls
+    if NUMPY_AVAILABLE:
+        traffic_values = _RNG.integers(50, 201, size=24).tolist()
+        entropy_values = _RNG.uniform(0.1, 0.9, size=24).tolist()
+        attack_counts = _RNG.integers(
+            [low for _, _, low, _ in MOCK_ATTACK_CLASSES],
+            [high + 1 for _, _, _, high in MOCK_ATTACK_CLASSES]
+        ).tolist()
+    else:
+        traffic_values = [random.randint(50, 200) for _ in range(24)]
+        entropy_values = [random.uniform(0.1, 0.9) for _ in range(24)]
+        attack_counts = [random.randint(low, high) for _, _, low, high in MOCK_ATTACK_CLASSES]
     
     return {
         "traffic_summary": {
@@ -343,81 +420,77 @@ def generate_mock_analysis_data():
             "unique_ips": random.randint(50, 200),
             "attack_confidence": random.uniform(0, 1)
         },
-        "protocol_distribution": [
-            {"protocol": "TCP", "percentage": 60},
-            {"protocol": "UDP", "percentage": 25},
-            {"protocol": "ICMP", "percentage": 10},
-            {"protocol": "Other", "percentage": 5}
-        ],
         "traffic_patterns": {
             "labels": hour_labels,
-            "values": [random.randint(50, 200) for _ in range(24)]
+            "values": traffic_values
         },
         "entropy_data": {
             "labels": hour_labels,
-            "values": [random.uniform(0.1, 0.9) for _ in range(24)]
-        },
-        "feature_importance": {
-            "labels": ["SYN Ratio", "Packet Rate", "Entropy", "Source IP Diversity", "TTL Variance"],
-            "values": [0.35, 0.25, 0.2, 0.15, 0.05]
+            "values": entropy_values
         },
         "attack_classification": [
-            {"attackType": "TCP SYN Flood", "confidence": 0.85, "count": random.randint(10, 50)},
-            {"attackType": "UDP Flood", "confidence": 0.65, "count": random.randint(5, 30)},
-            {"attackType": "ICMP Flood", "confidence": 0.45, "count": random.randint(2, 20)},
-            {"attackType": "HTTP Flood", "confidence": 0.75, "count": random.randint(8, 40)}
+            {"attackType": attack_type, "confidence": confidence, "count": count}
+            for (attack_type, confidence, _, _), count in zip(MOCK_ATTACK_CLASSES, attack_counts)
         ]
     }
 
+# Pre-serialized JSON for responses that are identical on every request
+def json_response(body):
+    """Wrap an already serialized JSON string in a response"""
+    return Response(body, mimetype='application/json')
+
+def merge_json_objects(dynamic_data, static_json):
+    """Serialize dynamic_data and append the fields of a pre-serialized JSON object"""
+    # Splicing an empty object on either side would leave a dangling comma
+    if not dynamic_data:
+        return static_json
+    dynamic_json = app.json.dumps(dynamic_data)
+    if static_json == "{}":
+        return dynamic_json
+    return dynamic_json[:-1] + ", " + static_json[1:]
+
+TOPOLOGY_JSON = app.json.dumps(generate_mock_network_topology())
+VULNERABILITY_JSON = app.json.dumps(generate_mock_vulnerability_analysis())
+TRAFFIC_PATHS_JSON = app.json.dumps(generate_mock_traffic_paths())
+ANALYSIS_STATIC_JSON = app.json.dumps(ANALYSIS_STATIC_DATA)
+STATUS_STATIC_JSON = app.json.dumps({
+    "status": "online",
+    "version": "1.0.0",
+    "features": {
+        "numpy": NUMPY_AVAILABLE,
+        "flask": True
+    }
+})
+
 # API routes
 @app.route('/api/python/status', methods=['GET'])
 def get_status():
     """Return the status of the Python API server"""
-    return jsonify({
-        "status": "online",
-        "version": "1.0.0",
-        "timestamp": datetime.now().isoformat(),
-        "features": {
-            "numpy": NUMPY_AVAILABLE,
-            "flask": True
-        }
-    })
+    return json_response(merge_json_objects({"timestamp": datetime.now().isoformat()}, STATUS_STATIC_JSON))
 
 @app.route('/api/python/analysis', methods=['GET'])
 def get_analysis():
     """Return comprehensive analysis data"""
     try:
-        analysis_data = generate_mock_analysis_data()
-        return jsonify(analysis_data)
+        # Only the random/time-dependent fields are serialized per request
+        return json_response(merge_json_objects(generate_mock_analysis_dynamic_data(), ANALYSIS_STATIC_JSON))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/python/topology', methods=['GET'])
 def get_topology():
     """Return network topology data"""
-    try:
-        topology = generate_mock_network_topology()
-        return jsonify(topology)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return json_response(TOPOLOGY_JSON)
 
 @app.route('/api/python/vulnerability', methods=['GET'])
 def get_vulnerability():
     """Return vulnerability analysis data"""
-    try:
-        vulnerability = generate_mock_vulnerability_analysis()
-        return jsonify(vulnerability)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return json_response(VULNERABILITY_JSON)
 
 @app.route('/api/python/traffic-paths', methods=['GET'])
 def get_traffic_paths():
     """Return traffic paths data"""
-    try:
-        paths = generate_mock_traffic_paths()
-        return jsonify(paths)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return json_response(TRAFFIC_PATHS_JSON)
 
 @app.route('/api/python/train', methods=['POST'])
 def train_model():
@@ -456,22 +529,12 @@ def mitigate_attack():
         state = data.get('state', [0.5] * 8)  # Default state if none provided
         normalized_state = normalize_state(state)
         
-        # Calculate threat score based on state features
-        # These are algorithmic weights for different network features
-        feature_weights = [
-            0.18,  # source_entropy
-            0.12,  # destination_entropy
-            0.25,  # syn_ratio
-            0.15,  # traffic_volume
-            0.20,  # packet_rate
-            0.05,  # unique_src_ips_count
-            0.02,  # unique_dst_ips_count
-            0.03   # protocol_distribution
-        ]
-        
-        # Calculate weighted score
-        weighted_state = [normalized_state[i] * feature_weights[i] for i in range(len(normalized_state))]
-        threat_score = sum(weighted_state)
+        # Calculate threat score based on state features; with NumPy the
+        # normalized state stays an ndarray and the weighted sum is a single dot product
+        if NUMPY_AVAILABLE:
+            threat_score = float(normalized_state @ _FEATURE_WEIGHTS[:normalized_state.size])
+        else:
+            threat_score = sum(normalized_state[i] * FEATURE_WEIGHTS[i] for i in range(len(normalized_state)))
         
         # Decision logic for action selection
         if threat_score > 0.7:
@@ -492,25 +555,19 @@ def mitigate_attack():
         # Create alert in MongoDB if we're detecting an attack
         if action > 0:
             # Only try to use MongoDB if it's available
-            if MONGO_AVAILABLE:
+            if _ALERTS is not None:
+                # Save alert data
+                alert_data = {
+                    "timestamp": datetime.now(),
+                    "type": "Algorithmic Detection",
+                    "severity": "High" if action > 1 else "Medium",
+                    "message": f"Detected potential attack, action: {mitigation['name']}",
+                    "source_ips": data.get("source_ips", []),
+                    "confidence": confidence,
+                    "threat_score": threat_score
+                }
                 try:
-                    # Using the MongoDB client directly
-                    client = MongoClient(os.environ.get('MONGODB_URI', 'mongodb://localhost:27017'))
-                    db = client.get_database('ddos_defender')
-                    alerts_collection = db.get_collection('alerts')
-                    
-                    # Save alert data
-                    alert_data = {
-                        "timestamp": datetime.now(),
-                        "type": "Algorithmic Detection",
-                        "severity": "High" if action > 1 else "Medium",
-                        "message": f"Detected potential attack, action: {mitigation['name']}",
-                        "source_ips": data.get("source_ips", []),
-                        "confidence": confidence,
-                        "threat_score": threat_score
-                    }
-                    alerts_collection.insert_one(alert_data)
-                    client.close()
+                    _ALERTS.insert_one(alert_data)
                 except Exception as mongo_error:
                     print(f"Error saving alert to MongoDB: {mongo_error}")
             else:
@@ -521,7 +578,7 @@ def mitigate_attack():
             "success": True,
             "action": action,
             "mitigation": mitigation,
-            "state": normalized_state if isinstance(normalized_state, list) else normalized_state.tolist(),
+            "state": normalized_state.tolist() if NUMPY_AVAILABLE else normalized_state,
             "confidence": confidence,
             "threat_score": threat_score,
             "timestamp": datetime.now().isoformat()
@@ -923,8 +980,25 @@ def simulate_attack():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def start_server(port=5001, debug=True):
-    """Start the Flask server"""
+def start_server(port=5001, debug=False):
+    """
+    Start the API server
+    
+    Without debug the app is served by waitress (multi-threaded production WSGI
+    server) when it is installed, otherwise by the Flask development server.
+    For multiple worker processes run the module-level app under gunicorn instead, e.g.
+    gunicorn -k gevent -w 4 -b 0.0.0.0:5001 python_api:app
+    """
+    if not debug:
+        try:
+            from waitress import serve
+            threads = max(8, (os.cpu_count() or 1) * 2)
+            print(f"Serving Python API on waitress ({threads} threads)")
+            serve(app, host='0.0.0.0', port=port, threads=threads)
+            return
+        except ImportError:
+            print("Warning: waitress not available, using the Flask development server (pip install waitress)")
+    
     app.run(host='0.0.0.0', port=port, debug=debug)
 
 if __name__ == '__main__':
@@ -6,8 +6,11 @@ DDoS Defender - Python API Server Runner
 This script starts the Python API server on port 5001.
 """
 
+import os
+
 from python_api import start_server
 
 if __name__ == '__main__':
     print("Starting DDoS Defender Python API server on port 5001...")
-    start_server(port=5001, debug=True)
\ No newline at end of file
+    # PYTHON_API_DEBUG=1 runs the Flask development server with the debugger/reloader
+    start_server(port=5001, debug=os.environ.get("PYTHON_API_DEBUG") == "1")
\ No newline at end of file